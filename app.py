@@ -1,6 +1,7 @@
 import streamlit as st
 import utils.data_manager as data_manager
-from views import setup_view, match_view, leaderboard_view
+from utils import instrumentation
+from views import setup_view, match_view, leaderboard_view, diagnostics_view
 
 # Page Config (Dark Mode / Mobile)
 st.set_page_config(
@@ -62,17 +63,60 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+LEAGUE_KEY = "league"
+NEW_LEAGUE_KEY = "new_league_name"
+
+# Each browser session works on the league it selected; fragments re-running
+# on their own resolve it the same way
+data_manager.set_league_resolver(lambda: st.session_state.get(LEAGUE_KEY, data_manager.DEFAULT_LEAGUE))
+# Measurements of each rerun go to the session's diagnostics (when enabled)
+instrumentation.set_sink(diagnostics_view.record_trace)
+
+def _reset_league_state():
+    # Widget state (selections, pagination cursors, card edits) belongs to the previous league
+    keep = (LEAGUE_KEY, NEW_LEAGUE_KEY, diagnostics_view.DIAGNOSTICS_KEY, diagnostics_view.STATS_KEY)
+    for key in list(st.session_state):
+        if key not in keep:
+            del st.session_state[key]
+
+def _create_league():
+    name = st.session_state.get(NEW_LEAGUE_KEY, "")
+    try:
+        league_id = data_manager.create_league(name)
+    except ValueError as e:
+        st.session_state['league_error'] = str(e)
+        return
+    _reset_league_state()
+    st.session_state[LEAGUE_KEY] = league_id
+    st.session_state[NEW_LEAGUE_KEY] = ""
+
+def render_league_picker():
+    with st.sidebar:
+        st.selectbox("League", data_manager.list_leagues(), key=LEAGUE_KEY, on_change=_reset_league_state)
+        with st.expander("New league"):
+            st.text_input("Name", key=NEW_LEAGUE_KEY)
+            st.button("Create", on_click=_create_league, key="create_league")
+            if 'league_error' in st.session_state:
+                st.error(st.session_state.pop('league_error'))
+
 def main():
+    render_league_picker()
     st.title("⚽ 3v3 Match Tracker")
+    if data_manager.current_league() != data_manager.DEFAULT_LEAGUE:
+        st.caption(f"League: {data_manager.current_league()}")
     
     # Load session state to determine active tab needed?
     # Streamlit Tabs are good.
     
-    tab1, tab2, tab3 = st.tabs(["⚡ Match Center", "📊 Leaderboard", "⚙️ Setup"])
+    diagnostics = st.sidebar.toggle("Diagnostics", key=diagnostics_view.DIAGNOSTICS_KEY,
+                                    help="Time and count database calls and renders per rerun")
+    tab1, tab2, tab3, *tab_diagnostics = st.tabs(
+        ["⚡ Match Center", "📊 Leaderboard", "⚙️ Setup"] + (["🩺 Diagnostics"] if diagnostics else [])
+    )
     
     with tab1:
         # If no session, prompt to setup
-        session = data_manager.load_current_session()
+        session = data_manager.load_current_session(mutable=False)
         if session:
             match_view.render_matches()
         else:
@@ -87,5 +131,10 @@ def main():
     with tab3:
         setup_view.render_setup()
 
+    if diagnostics:
+        with tab_diagnostics[0]:
+            diagnostics_view.render_diagnostics()
+
 if __name__ == "__main__":
-    main()
+    with instrumentation.trace("rerun"):
+        main()
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the data and leaderboard paths.
+
+    python -m benchmarks                     # run all sizes, compare to baseline.json
+    python -m benchmarks --sizes small       # subset of sizes
+    python -m benchmarks --save-baseline     # record a new baseline
+    python -m benchmarks.startup             # cold-start import and first-render profile
+    python -m benchmarks.concurrency         # concurrent scorekeepers stress test
+
+Each size runs in a fresh subprocess inside a scratch directory, so the
+app's relative data/app.db never touches the real database.
+"""
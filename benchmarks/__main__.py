@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from benchmarks.synthetic import SIZES
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+# A benchmark regresses when it is this many times slower than the baseline...
+DEFAULT_THRESHOLD = 1.5
+# ...and slower by more than this (seconds), to ignore timer noise on tiny numbers
+NOISE_FLOOR = 0.002
+
+def run_sizes(sizes: List[str], seed: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for size in sizes:
+        print(f"Running '{size}' ({SIZES[size]['players']} players, {SIZES[size]['jornadas']} jornadas)...")
+        with tempfile.TemporaryDirectory() as scratch:
+            out = os.path.join(scratch, "results.json")
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", size, "--seed", str(seed), "--out", out],
+                cwd=scratch, env=env, check=True, stdout=subprocess.DEVNULL,
+            )
+            with open(out) as f:
+                results[size] = json.load(f)
+    return results
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]):
+    sizes = list(results)
+    names = list(next(iter(results.values())))
+    print(f"{'benchmark':<24}" + "".join(f"{s:>22}" for s in sizes))
+    for name in names:
+        cells = []
+        for size in sizes:
+            value = results[size].get(name)
+            base = baseline.get(size, {}).get(name)
+            cell = f"{value * 1000:.2f}ms" if value is not None else "-"
+            if value is not None and base:
+                cell += f" ({value / base:.2f}x)"
+            cells.append(f"{cell:>22}")
+        print(f"{name:<24}" + "".join(cells))
+
+def find_regressions(results, baseline, threshold: float) -> List[str]:
+    regressions = []
+    for size, benches in results.items():
+        for name, value in benches.items():
+            base = baseline.get(size, {}).get(name)
+            if base and value > base * threshold and value - base > NOISE_FLOOR:
+                regressions.append(f"{size}/{name}: {base * 1000:.2f}ms -> {value * 1000:.2f}ms ({value / base:.2f}x)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data and leaderboard paths.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threshold", type=float, default=None,
+                        help=f"regression factor vs. baseline (default: baseline's, else {DEFAULT_THRESHOLD})")
+    parser.add_argument("--save-baseline", action="store_true", help="write results to baseline.json")
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            stored = json.load(f)
+    baseline = stored.get('results', {})
+    threshold = args.threshold or stored.get('threshold', DEFAULT_THRESHOLD)
+
+    results = run_sizes(args.sizes, args.seed)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        merged = dict(baseline, **results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({'threshold': threshold, 'seed': args.seed, 'results': merged}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_FILE}")
+        return
+
+    regressions = find_regressions(results, baseline, threshold)
+    if regressions:
+        print(f"\nRegressions (> {threshold}x baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+if __name__ == "__main__":
+    main()
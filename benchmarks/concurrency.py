@@ -0,0 +1,149 @@
+"""
+Stress test for concurrent scorekeepers: many processes load the live
+session, edit one score of a random match, and save that match (as a match
+card does), all against one SQLite file.
+
+    python -m benchmarks.concurrency                     # 8 writers, 200 saves each
+    python -m benchmarks.concurrency --writers 16 --saves 500
+    python -m benchmarks.concurrency --writers 16 --leagues 4   # writers spread over 4 leagues
+
+Every score written is unique, so each acknowledged save can be traced: per
+match and side, acknowledged writes must form a single chain from the
+initial score to the stored one. Two acknowledged writes from the same base
+value would mean one overwrote the other unseen (a lost update). Exits 1 if
+that, or any other inconsistency, is found. With --leagues, writers are
+spread round-robin over that many leagues, each with its own session.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+FIELDS = ('score_a', 'score_b')
+
+def _league_of(writer: int, leagues: int) -> str:
+    from utils.database import DEFAULT_LEAGUE
+    return DEFAULT_LEAGUE if leagues == 1 else f"league-{writer % leagues}"
+
+def _seed(seed: int, league_id: str):
+    from benchmarks.synthetic import make_league
+    from utils import data_manager
+
+    data_manager.use_league(league_id)
+    league = make_league('small', seed)
+    data_manager.save_players(league['players'])
+    session = league['session']
+    for match in session['matches']:
+        match['score_a'] = match['score_b'] = 0
+    data_manager.get_db().save_session(session)
+
+def _writer(writer: int, league_id: str, saves: int, seed: int, think: float, scratch: str, queue):
+    os.chdir(scratch)
+    from utils import data_manager
+    data_manager.use_league(league_id)
+
+    rng = random.Random(seed + writer)
+    acked, conflicts, merged = [], 0, 0
+    for seq in range(1, saves + 1):
+        session = data_manager.load_current_session(mutable=False)
+        match = rng.choice(session['matches'])
+        field = rng.choice(FIELDS)
+        base = match[field]
+        # Unique per writer and save, and never 0 (the initial score)
+        value = writer * 1_000_000 + seq
+        time.sleep(rng.uniform(0, think)) # a referee typing
+        result = data_manager.save_session_match(dict(match, **{field: value}), match)
+        if result['conflicts']:
+            conflicts += 1
+        else:
+            acked.append((match['id'], field, base, value))
+            merged += result['merged']
+    queue.put({'league': league_id, 'acked': acked, 'conflicts': conflicts, 'merged': merged})
+
+def check(final: Dict[str, Dict], acked: List[tuple]) -> List[str]:
+    """Lost updates and broken chains, as readable messages (empty when consistent)."""
+    problems = []
+    chains = {}
+    for match_id, field, base, value in acked:
+        links = chains.setdefault((match_id, field), {})
+        if base in links:
+            problems.append(f"lost update on {match_id}/{field}: {links[base]} and {value} both replaced {base}")
+        links[base] = value
+    for (match_id, field), links in chains.items():
+        current, steps = 0, 0
+        while current in links:
+            current = links[current]
+            steps += 1
+        stored = final[match_id][field]
+        if stored != current:
+            problems.append(f"{match_id}/{field}: stored {stored}, acknowledged chain ends at {current}")
+        elif steps != len(links):
+            problems.append(f"{match_id}/{field}: {len(links) - steps} acknowledged writes are not in the chain")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent scorekeeper stress test.")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=200, help="saves per writer")
+    parser.add_argument("--think", type=float, default=0.005, help="max seconds between load and save")
+    parser.add_argument("--leagues", type=int, default=1, help="leagues the writers are spread over")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    leagues = sorted({_league_of(w, args.leagues) for w in range(1, args.writers + 1)})
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        for league_id in leagues:
+            _seed(args.seed, league_id)
+
+        # Spawned, not forked: SQLite connections must not cross a fork
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        procs = [
+            ctx.Process(target=_writer, args=(w, _league_of(w, args.leagues), args.saves, args.seed, args.think, scratch, queue))
+            for w in range(1, args.writers + 1)
+        ]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        reports = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        from utils.database import get_db
+        final = {}
+        for league_id in leagues:
+            final[league_id] = {m['id']: m for m in get_db(league_id).get_session()['matches']}
+            get_db(league_id).close()
+        os.chdir(ROOT)
+
+    acked = [a for r in reports for a in r['acked']]
+    conflicts = sum(r['conflicts'] for r in reports)
+    merged = sum(r['merged'] for r in reports)
+    total = args.writers * args.saves
+    print(f"{args.writers} writers x {args.saves} saves over {len(leagues)} league(s) in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} saves/s)")
+    print(f"acknowledged: {len(acked)}, merged with a concurrent save: {merged}, conflicts: {conflicts}")
+
+    problems = []
+    for league_id in leagues:
+        problems += check(final[league_id], [a for r in reports if r['league'] == league_id for a in r['acked']])
+    if any(p.exitcode for p in procs):
+        problems.append("a writer process failed")
+    if problems:
+        print(f"\n{len(problems)} problems:\n  " + "\n  ".join(problems[:20]))
+        return 1
+    print("\nNo lost updates.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Cold-start profile: what `import utils.data_manager` costs (with a per-module
+-X importtime breakdown) and how long the first full render takes.
+
+    python -m benchmarks.startup                              # report only
+    python -m benchmarks.startup --import-budget 100 --render-budget 3000
+
+Every measurement runs in a fresh interpreter inside a scratch directory
+seeded with a synthetic league, so caches and open connections never carry
+over. Exits 1 when a budget (in milliseconds) is exceeded.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.synthetic import SIZES
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+# Module whose import every app process and CLI script pays for
+ENTRY_MODULE = "utils.data_manager"
+
+def _seed(size: str, seed: int):
+    from benchmarks.synthetic import make_league
+    from utils import data_manager
+    from utils.database import get_db
+
+    league = make_league(size, seed)
+    data_manager.save_players(league['players'])
+    for jornada in league['jornadas']:
+        get_db().append_matches(jornada)
+    get_db().save_session(league['session'])
+    # A running app always has an up-to-date ratings checkpoint
+    data_manager.load_ratings()
+
+# Run with -c rather than through this module, so nothing is imported beforehand
+IMPORT_SNIPPET = (
+    "import json, time; start = time.perf_counter(); import {module}; "
+    "print(json.dumps({{'seconds': time.perf_counter() - start}}))"
+).format(module=ENTRY_MODULE)
+
+def _time_first_render() -> float:
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise AssertionError(f"first render raised: {at.exception[0].value}")
+    return elapsed
+
+def _run_worker(name: str, scratch: str, *args: str, importtime: bool = False) -> Tuple[dict, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    if name == 'import':
+        cmd += ["-c", IMPORT_SNIPPET]
+    else:
+        cmd += ["-m", "benchmarks.startup", "--worker", name, *args]
+    proc = subprocess.run(cmd, cwd=scratch, env=env, check=True, capture_output=True, text=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+def parse_importtime(stderr: str, module: str = ENTRY_MODULE) -> List[Tuple[str, int, int]]:
+    """
+    (module, self us, cumulative us) for `module` and everything it imported,
+    from -X importtime output. Interpreter startup (site, encodings) is left out.
+    """
+    rows = []
+    block = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        block.append((name.strip(), int(self_us), int(cumulative_us)))
+        # A top-level import is printed last, after everything it pulled in
+        if not name.startswith("  "):
+            if name.strip() == module:
+                rows = block
+            block = []
+    return rows
+
+def profile(size: str, seed: int, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as scratch:
+        _run_worker('seed', scratch, "--size", size, "--seed", str(seed))
+        imports = [_run_worker('import', scratch)[0]['seconds'] for _ in range(repeat)]
+        renders = [_run_worker('render', scratch)[0]['seconds'] for _ in range(repeat)]
+        _, stderr = _run_worker('import', scratch, importtime=True)
+    return {
+        'import': min(imports),
+        'render': min(renders),
+        'modules': parse_importtime(stderr),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile cold start: entry-module import and first render.")
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement (best is kept)")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--import-budget", type=float, default=None, help=f"max ms to import {ENTRY_MODULE}")
+    parser.add_argument("--render-budget", type=float, default=None, help="max ms for the first render")
+    parser.add_argument("--worker", choices=["seed", "render"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == 'seed':
+        _seed(args.size, args.seed)
+        print(json.dumps({}))
+        return 0
+    if args.worker == 'render':
+        print(json.dumps({'seconds': _time_first_render()}))
+        return 0
+
+    result = profile(args.size, args.seed, args.repeat)
+
+    print(f"Slowest modules imported by {ENTRY_MODULE} (self time):")
+    print(f"{'module':<48}{'self':>10}{'cumulative':>12}")
+    for module, self_us, cumulative_us in sorted(result['modules'], key=lambda r: -r[1])[:args.top]:
+        print(f"{module:<48}{self_us / 1000:>8.2f}ms{cumulative_us / 1000:>10.2f}ms")
+    print()
+    print(f"import {ENTRY_MODULE}: {result['import'] * 1000:.2f}ms")
+    print(f"first render ({args.size}): {result['render'] * 1000:.2f}ms")
+
+    over = []
+    for label, value, budget in (("import", result['import'], args.import_budget),
+                                 ("first render", result['render'], args.render_budget)):
+        if budget is not None and value * 1000 > budget:
+            over.append(f"{label}: {value * 1000:.2f}ms > {budget:.0f}ms budget")
+    if over:
+        print("\nOver budget:\n  " + "\n  ".join(over))
+        return 1
+    print("\nWithin budget.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_league, make_session
+
+def timed(fn: Callable, repeat: int = 5, setup: Optional[Callable] = None) -> float:
+    """Best wall time of `repeat` calls, in seconds. `setup` runs untimed before each call."""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _write_legacy_json(data_dir: str, league: Dict):
+    history = [m for jornada in league['jornadas'] for m in jornada]
+    for name, value in (('players.json', league['players']),
+                        ('matches_history.json', history),
+                        ('current_session.json', league['session'])):
+        with open(os.path.join(data_dir, name), 'w') as f:
+            json.dump(value, f)
+
+def _app_test(script: Optional[str] = None):
+    from streamlit.testing.v1 import AppTest
+    if script is None:
+        return AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    return AppTest.from_string(script, default_timeout=600)
+
+def run_size(size: str, seed: int = 42) -> Dict[str, float]:
+    """Run every benchmark for one data size. Must run with a scratch cwd."""
+    league = make_league(size, seed)
+    players = league['players']
+    history = [m for jornada in league['jornadas'] for m in jornada]
+    session = league['session']
+    rng = random.Random(seed + 1)
+
+    # Importing data_manager opens ./data/app.db and applies every migration
+    from utils import data_manager, migrations
+    from utils.database import db
+
+    results = {}
+
+    # --- Migrations: legacy JSON import, and the up-to-date check on every open ---
+    def clear_db():
+        db.bulk_save_players([])
+        db.save_matches([])
+        db.clear_session()
+        db.execute_query("PRAGMA user_version = 1")
+    _write_legacy_json(data_manager.DATA_DIR, league)
+    results['migrate_json'] = timed(lambda: migrations.migrate(db), repeat=3, setup=clear_db)
+    results['migrate_check'] = timed(lambda: migrations.migrate(db))
+
+    # --- DatabaseManager load/save ---
+    results['db_save_players'] = timed(lambda: db.bulk_save_players(players))
+    results['db_load_players'] = timed(db.get_all_players)
+    results['db_save_matches'] = timed(lambda: db.save_matches(history), repeat=3)
+    results['db_load_matches'] = timed(db.get_all_matches)
+    new_jornadas = iter([make_session(rng, players, complete=True)['matches'] for _ in range(5)])
+    results['db_append_jornada'] = timed(lambda: db.append_matches(next(new_jornadas)))
+    results['db_save_session'] = timed(lambda: db.save_session(session))
+    results['db_load_session'] = timed(db.get_session)
+
+    # --- Bulk import: the whole history streamed into an empty database ---
+    from utils.database import DatabaseManager
+    import_target = {}
+    def empty_import_db():
+        if import_target:
+            import_target['db'].close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists("import.db" + suffix):
+                    os.remove("import.db" + suffix)
+        import_target['db'] = DatabaseManager("import.db")
+    results['import_history'] = timed(lambda: import_target['db'].import_history(iter(history)), repeat=3,
+                                      setup=empty_import_db)
+    import_target['db'].close()
+
+    def edit_one_score():
+        loaded = data_manager.load_current_session()
+        loaded['matches'][0]['score_a'] += 1
+        data_manager.save_current_session(loaded)
+    results['session_score_edit'] = timed(edit_one_score)
+
+    def edit_one_card():
+        base = data_manager.load_current_session(mutable=False)['matches'][0]
+        data_manager.save_session_match(dict(base, score_a=base['score_a'] + 1), base)
+    results['card_score_edit'] = timed(edit_one_card)
+
+    # --- Leaderboard ---
+    history = db.get_all_matches()
+    reference = data_manager.calculate_leaderboard_reference(players, history)
+    if not reference.equals(data_manager.calculate_leaderboard(players, history)):
+        raise AssertionError(f"[{size}] vectorized leaderboard differs from the reference")
+    results['leaderboard'] = timed(lambda: data_manager.calculate_leaderboard(players, history))
+    results['leaderboard_reference'] = timed(
+        lambda: data_manager.calculate_leaderboard_reference(players, history), repeat=3
+    )
+    results['leaderboard_live'] = timed(
+        lambda: data_manager.calculate_live_leaderboard(players, session['matches'])
+    )
+
+    # --- Ratings ---
+    from utils import ratings
+    results['ratings_replay'] = timed(lambda: ratings.refresh_ratings(db, rebuild=True), repeat=3)
+    def append_jornada():
+        db.append_matches(make_session(rng, players, complete=True)['matches'])
+    results['ratings_incremental'] = timed(lambda: ratings.refresh_ratings(db), setup=append_jornada)
+
+    # --- History snapshot: columnar build, then analysis over the mapped arrays ---
+    from utils import snapshot
+    def stale_snapshot():
+        manifest = os.path.join(snapshot.snapshot_dir(db), snapshot.MANIFEST)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+    results['snapshot_build'] = timed(lambda: snapshot.build(db), repeat=3, setup=stale_snapshot)
+    snap = data_manager.load_history_snapshot()
+    history = db.get_all_matches()
+    if not data_manager.calculate_leaderboard(players, history).equals(data_manager.calculate_history_leaderboard(players)):
+        raise AssertionError(f"[{size}] snapshot leaderboard differs from the row-based one")
+    if snap.replay_ratings(ratings.DEFAULT_PARAMS) != ratings.refresh_ratings(db, rebuild=True):
+        raise AssertionError(f"[{size}] snapshot rating replay differs from the row-based one")
+    results['leaderboard_snapshot'] = timed(lambda: data_manager.calculate_history_leaderboard(players))
+    results['ratings_replay_snapshot'] = timed(lambda: ratings.refresh_ratings(db, rebuild=True, snapshot=snap), repeat=3)
+    pair = [p['id'] for p in players[:2]]
+    results['head_to_head'] = timed(lambda: snap.head_to_head(*pair))
+
+    # --- Team generation: the whole player pool into teams of three ---
+    from utils import team_generator
+    pool = [p['id'] for p in players]
+    strengths = data_manager.player_strengths(pool)
+    previous = data_manager.load_last_teammates()
+    results['team_generator'] = timed(
+        lambda: team_generator.generate_teams(pool, strengths, len(pool) // 3, previous_teammates=previous, seed=seed),
+        repeat=3
+    )
+
+    # --- Fixtures: those teams in two groups, three rounds, each team once per round ---
+    from utils import session_manager
+    generated = team_generator.generate_teams(pool, strengths, len(pool) // 3, seed=seed)['teams']
+    league_session = {
+        'teams': [dict(t, id=f"team-{i}") for i, t in enumerate(generated)],
+        'matches': session_manager.init_match_slots(rounds=3, matches_per_round=len(generated) // 4),
+    }
+    results['scheduler'] = timed(lambda: data_manager.schedule_session_matches(league_session, seed=seed), repeat=3)
+
+    # --- Full-page renders (warm reruns) ---
+    renders = {
+        'render_app': None,
+        'render_matches': "from views import match_view\nmatch_view.render_matches()",
+        'render_leaderboard': "from views import leaderboard_view\nleaderboard_view.render_leaderboard()",
+        'render_setup': "from views import setup_view\nsetup_view.render_setup()",
+        # What an edit re-runs now that cards are fragments (previously: render_app)
+        'render_match_card': f"from views import match_view\nmatch_view.render_match_card({session['matches'][0]['id']!r})",
+        'render_team_card': f"from views import setup_view\nsetup_view.render_team_card({session['teams'][0]['id']!r})",
+    }
+    for name, script in renders.items():
+        at = _app_test(script).run()
+        if at.exception:
+            raise AssertionError(f"[{size}] {name} raised: {at.exception[0].value}")
+        results[name] = timed(at.run, repeat=3)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite for one data size.")
+    parser.add_argument("size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="JSON file to write results to")
+    args = parser.parse_args()
+
+    results = run_size(args.size, args.seed)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import random
+import uuid
+from typing import List, Dict
+from utils import session_manager
+
+# Data sizes used by the benchmark suite
+SIZES = {
+    'small': {'players': 36, 'jornadas': 10},
+    'medium': {'players': 200, 'jornadas': 100},
+    'large': {'players': 1000, 'jornadas': 400},
+}
+
+def make_id(rng: random.Random) -> str:
+    """uuid4-shaped id drawn from the seeded generator."""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def make_players(rng: random.Random, n: int) -> List[Dict]:
+    return [{'id': make_id(rng), 'name': f"Player {i+1}"} for i in range(n)]
+
+def make_session(rng: random.Random, players: List[Dict], num_teams=12, rounds=3,
+                 matches_per_round=6, complete=False) -> Dict:
+    """
+    A session shaped like the Setup tab creates one: create_teams_empty teams
+    with 3 players each and init_match_slots matches with teams picked from
+    the slot's group. With complete=True every match has a final score.
+    """
+    teams = session_manager.create_teams_empty(num_teams=num_teams)
+    pool = rng.sample(players, min(len(players), num_teams * 3))
+    for i, team in enumerate(teams):
+        team['id'] = make_id(rng)
+        members = pool[i * 3:(i + 1) * 3]
+        team['players'] = [p['id'] for p in members]
+        team['player_names'] = [p['name'] for p in members]
+
+    teams_by_group = {}
+    for team in teams:
+        teams_by_group.setdefault(team['group'], []).append(team)
+
+    matches = session_manager.init_match_slots(rounds=rounds, matches_per_round=matches_per_round)
+    for match in matches:
+        match['id'] = make_id(rng)
+        team_a, team_b = rng.sample(teams_by_group[match['group']], 2)
+        match['team_a_id'] = team_a['id']
+        match['team_b_id'] = team_b['id']
+        match['score_a'] = rng.randint(0, 6)
+        match['score_b'] = rng.randint(0, 6)
+        if complete:
+            match['is_complete'] = True
+            match['team_a_players'] = list(team_a['players'])
+            match['team_b_players'] = list(team_b['players'])
+
+    return {'teams': teams, 'matches': matches, 'is_active': True}
+
+def make_history(rng: random.Random, players: List[Dict], jornadas: int) -> List[List[Dict]]:
+    """Finished jornadas, each the list of completed matches "Finish Jornada" would append."""
+    return [make_session(rng, players, complete=True)['matches'] for _ in range(jornadas)]
+
+def make_league(size: str, seed: int = 42) -> Dict:
+    """Players, finished jornadas and a live session for one of SIZES."""
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    players = make_players(rng, spec['players'])
+    return {
+        'players': players,
+        'jornadas': make_history(rng, players, spec['jornadas']),
+        'session': make_session(rng, players),
+    }
@@ -0,0 +1,50 @@
+import sys
+import os
+
+# Add project root to sys path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import data_manager, ratings
+
+def rebuild_and_check():
+    players = data_manager.load_players()
+    history = data_manager.load_matches_history()
+    print(f"Players: {len(players)}, Matches: {len(history)}")
+
+    # Check the stored stats before rebuilding them, or drift could never show up.
+    # Recomputed from the memory-mapped history snapshot when NumPy is available.
+    expected = data_manager.calculate_history_leaderboard(players)
+    stored = data_manager.calculate_live_leaderboard(players, [])
+
+    ok = True
+    if expected.equals(stored):
+        print("Player stats match the full recompute.")
+    else:
+        ok = False
+        diff = expected.compare(stored) if expected.shape == stored.shape else None
+        print("Mismatch between stored player stats and full recompute!")
+        if diff is not None:
+            print(diff)
+
+    print("Rebuilding player stats from match history...")
+    data_manager.rebuild_player_stats()
+
+    # Incrementally maintained ratings must equal a full replay in jornada order
+    incremental = data_manager.load_ratings()
+    ordered = sorted(history, key=lambda m: m['jornada_id'] or 0) # stable: keeps match order within a jornada
+    replayed = ratings.replay(ordered)
+    drift = [pid for pid in set(incremental) | set(replayed)
+             if abs(incremental.get(pid, {}).get('rating', 0) - replayed.get(pid, 0)) > 1e-6]
+    if drift:
+        ok = False
+        print(f"Ratings drifted from a full replay for {len(drift)} players; rebuilding.")
+    else:
+        print(f"Ratings match a full replay ({len(replayed)} players).")
+    data_manager.rebuild_ratings()
+    return ok
+
+if __name__ == "__main__":
+    # Optional league id; the default league otherwise
+    if len(sys.argv) > 1:
+        data_manager.use_league(sys.argv[1])
+    sys.exit(0 if rebuild_and_check() else 1)
@@ -0,0 +1,27 @@
+import random
+
+from utils.scheduler import schedule_group
+
+TEAMS = [f"t{i}" for i in range(6)]
+
+def _pair_keys(round_fixtures):
+    return [frozenset(pair) for pair in round_fixtures]
+
+def test_no_rematch_within_a_round_with_penalties():
+    # 3 rounds of 6 slots: a cycle (15 matches) plus 3 from a cheapest round,
+    # which must not be the cycle's last round, already in the final slot round
+    for seed in range(200):
+        rng = random.Random(seed)
+        weights = {}
+        def penalty(a, b):
+            return weights.setdefault((a, b), rng.randint(0, 5))
+        rounds = schedule_group(TEAMS, 3, 6, penalty, seed=seed)
+        assert [len(r) for r in rounds] == [6, 6, 6]
+        for r in rounds:
+            keys = _pair_keys(r)
+            assert len(set(keys)) == len(keys), f"seed {seed}: {r}"
+
+def test_every_pair_meets_once_before_any_rematch():
+    rounds = schedule_group(TEAMS, 3, 6, lambda a, b: 0, seed=1)
+    fixtures = [key for r in rounds for key in _pair_keys(r)]
+    assert len(set(fixtures[:15])) == 15
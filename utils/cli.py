@@ -0,0 +1,205 @@
+"""
+Bulk import and export of players, finished jornadas (match history) and
+the live session, as CSV or JSONL.
+
+Usage:
+    python -m utils.cli export players --out players.csv
+    python -m utils.cli export history --format jsonl > history.jsonl
+    python -m utils.cli import history other_league.jsonl other_league_2023.csv
+    python -m utils.cli import session session.jsonl
+    python -m utils.cli --league sunday-league export players
+
+Files are read and written as streams, a batch of rows at a time, so
+history of any size goes through bounded memory. Each import runs in one
+transaction. History imports skip match ids that are already stored, so
+re-running an import (or merging overlapping exports) never counts a match
+twice. Sessions are small and JSONL only (teams and matches do not share
+columns): one line per team and match plus a header line.
+"""
+import csv
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List
+
+PLAYER_FIELDS = ['id', 'name']
+HISTORY_FIELDS = [
+    'id', 'jornada_id', 'played_on', 'group', 'round', 'match_num',
+    'team_a_id', 'team_a_name', 'team_a_players', 'team_b_id', 'team_b_name', 'team_b_players',
+    'score_a', 'score_b', 'is_complete', 'recorded_at',
+]
+INT_FIELDS = ('round', 'match_num', 'score_a', 'score_b')
+LIST_FIELDS = ('team_a_players', 'team_b_players')
+# Separator for the player lists in CSV cells
+LIST_SEPARATOR = ';'
+
+def _format_for(path: str, requested: str = None) -> str:
+    if requested:
+        return requested
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+def _to_csv_row(record: Dict) -> Dict:
+    row = dict(record)
+    for key in LIST_FIELDS:
+        if key in row:
+            row[key] = LIST_SEPARATOR.join(row[key] or [])
+    if 'is_complete' in row:
+        row['is_complete'] = int(bool(row['is_complete']))
+    return row
+
+def _from_csv_row(row: Dict) -> Dict:
+    record = {k: (v if v != '' else None) for k, v in row.items()}
+    for key in INT_FIELDS:
+        if record.get(key) is not None:
+            record[key] = int(record[key])
+    for key in LIST_FIELDS:
+        if key in record:
+            record[key] = record[key].split(LIST_SEPARATOR) if record[key] else []
+    if 'is_complete' in record:
+        record['is_complete'] = record['is_complete'] not in (None, '0', 'false', 'False')
+    return record
+
+def write_records(records: Iterable[Dict], out, fmt: str, fields: List[str]) -> int:
+    """Write records one at a time. Returns how many were written."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow(_to_csv_row(record))
+            count += 1
+    else:
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def read_records(source, fmt: str) -> Iterator[Dict]:
+    """Records from an open file, one at a time. Malformed input raises ValueError naming the line."""
+    if fmt == 'csv':
+        reader = csv.DictReader(source)
+        try:
+            for row in reader:
+                yield _from_csv_row(row)
+        except (csv.Error, ValueError) as e:
+            raise ValueError(f"line {reader.line_num}: {e}") from e
+    else:
+        for number, line in enumerate(source, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"line {number}: {e.msg}") from e
+
+def export_session(db, out) -> int:
+    session = db.get_session()
+    if session is None:
+        return 0
+    header = {k: v for k, v in session.items() if k not in ('teams', 'matches')}
+    records = [dict(header, kind='session')]
+    records += [dict(t, kind='team') for t in session.get('teams', [])]
+    records += [dict(m, kind='match') for m in session.get('matches', [])]
+    return write_records(records, out, 'jsonl', [])
+
+def import_session(db, source) -> Dict[str, int]:
+    """
+    Replace the live session with the one in a JSONL export. An empty file
+    (the export when no session is active) clears the live session.
+    """
+    session = {'teams': [], 'matches': []}
+    has_header = False
+    for record in read_records(source, 'jsonl'):
+        kind = record.pop('kind', None)
+        if kind == 'team':
+            session['teams'].append(record)
+        elif kind == 'match':
+            record.pop('version', None)
+            session['matches'].append(record)
+        elif kind == 'session':
+            session.update(record)
+            has_header = True
+        else:
+            raise ValueError(f"Unknown session record kind: {kind!r}")
+    if not has_header:
+        if session['teams'] or session['matches']:
+            raise ValueError("No session header line")
+        db.clear_session()
+        return {'teams': 0, 'matches': 0}
+    db.save_session(session) # without a baseline this replaces every team and match
+    return {'teams': len(session['teams']), 'matches': len(session['matches'])}
+
+def main():
+    import argparse
+    from utils.database import DB_FILE, STREAM_BATCH_SIZE, DatabaseManager, league_db_path
+
+    parser = argparse.ArgumentParser(prog="python -m utils.cli", description="Import or export league data.")
+    parser.add_argument("--db", default=DB_FILE, help=f"database file (default: {DB_FILE})")
+    parser.add_argument("--league", help="league id (instead of --db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write players, history or the session")
+    export.add_argument("kind", choices=["players", "history", "session"])
+    export.add_argument("--out", default="-", help="output file (default: stdout)")
+    export.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension, else jsonl")
+
+    imp = commands.add_parser("import", help="read players, history or a session")
+    imp.add_argument("kind", choices=["players", "history", "session"])
+    imp.add_argument("files", nargs="+", help="input files ('-' for stdin)")
+    imp.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension, else jsonl")
+    imp.add_argument("--batch-size", type=int, default=STREAM_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.kind == "session" and args.format == "csv":
+        parser.error("sessions are JSONL only")
+
+    try:
+        db_path = league_db_path(args.league) if args.league else args.db
+    except ValueError as e:
+        parser.error(str(e))
+    db = DatabaseManager(db_path)
+    try:
+        if args.command == "export":
+            out = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+            try:
+                fmt = _format_for(args.out, args.format)
+                if args.kind == "players":
+                    count = write_records(db.iter_players(), out, fmt, PLAYER_FIELDS)
+                elif args.kind == "history":
+                    count = write_records(db.iter_history(), out, fmt, HISTORY_FIELDS)
+                else:
+                    count = export_session(db, out)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            # Counts go to stderr so stdout stays clean for piping
+            print(f"Exported {count} {args.kind} records.", file=sys.stderr)
+            return 0
+
+        for path in args.files:
+            source = sys.stdin if path == "-" else open(path, newline="")
+            try:
+                records = read_records(source, _format_for(path, args.format))
+                if args.kind == "players":
+                    count = db.import_players(records, args.batch_size)
+                    print(f"{path}: {count} players imported (existing ids updated).")
+                elif args.kind == "history":
+                    result = db.import_history(records, args.batch_size)
+                    print(f"{path}: {result['imported']} matches in {result['jornadas']} jornadas imported, "
+                          f"{result['skipped']} duplicates skipped.")
+                else:
+                    result = import_session(db, source)
+                    if result['teams'] or result['matches']:
+                        print(f"{path}: session with {result['teams']} teams and {result['matches']} matches imported.")
+                    else:
+                        print(f"{path}: no session in the file; live session cleared.")
+            except ValueError as e:
+                # Nothing from this file was stored: each import is one transaction
+                parser.error(f"{path}: {e}")
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,146 +1,568 @@
-import json
+import gzip
 import os
+import re
 import shutil
-import pandas as pd
-from typing import List, Dict
-from utils.database import db, DB_FILE
+import tempfile
+from types import MappingProxyType
+from typing import List, Dict, Optional, Callable, Any, TYPE_CHECKING
+from utils import database
+from utils.database import DEFAULT_LEAGUE
+from utils.standings import STAT_KEYS, accumulate, aggregate_arrays, empty_stats, subtract
+from utils.session_manager import SessionIndex
+from utils.player_index import PlayerIndex
+from utils import ratings as rating_engine
+from utils import instrumentation, session_manager, snapshot as history_snapshot, team_generator
+
+if TYPE_CHECKING: # pandas is imported on first leaderboard build, not at startup
+    import pandas as pd
 
 DATA_DIR = "data"
-PLAYERS_FILE = os.path.join(DATA_DIR, "players.json")
-MATCHES_FILE = os.path.join(DATA_DIR, "matches_history.json")
-SESSION_FILE = os.path.join(DATA_DIR, "current_session.json")
+GZIP_MAGIC = b'\x1f\x8b'
 
 def ensure_data_dir():
     # Only ensures directory exists, file creation handled by DB or migration
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
-def migrate_json_to_db_if_needed():
-    """Migrate legacy JSON data to SQLite if DB is empty and JSON exists."""
-    # Check if DB has players (proxy for initialized)
-    players = db.get_all_players()
-    if not players and os.path.exists(PLAYERS_FILE):
-        try:
-            with open(PLAYERS_FILE, 'r') as f:
-                legacy_players = json.load(f)
-            if legacy_players:
-               db.bulk_save_players(legacy_players)
-               print("Migrated players from JSON to DB.")
-        except Exception as e:
-            print(f"Migration error (Players): {e}")
-
-    # Check matches
-    matches = db.get_all_matches()
-    if not matches and os.path.exists(MATCHES_FILE):
-        try:
-            with open(MATCHES_FILE, 'r') as f:
-                legacy_matches = json.load(f)
-            if legacy_matches:
-                db.save_matches(legacy_matches)
-                print("Migrated matches from JSON to DB.")
-        except Exception as e:
-            print(f"Migration error (Matches): {e}")
-
-    # Check session
-    session = db.get_session()
-    if not session and os.path.exists(SESSION_FILE):
-        try:
-            with open(SESSION_FILE, 'r') as f:
-                legacy_session = json.load(f)
-            if legacy_session:
-                db.save_session(legacy_session)
-                print("Migrated session from JSON to DB.")
-        except Exception as e:
-            print(f"Migration error (Session): {e}")
-
-# Run migration on module load (simple check)
+# The legacy JSON import and schema upgrades run once per database, when it is
+# first opened (see utils/migrations.py)
 ensure_data_dir()
-migrate_json_to_db_if_needed()
+
+# --- Leagues ---
+# Every function here works on the current league. The app resolves it from
+# the browser session's selection (see app.py); scripts pin one with use_league.
+_league_resolver: Callable[[], str] = lambda: DEFAULT_LEAGUE
+
+def set_league_resolver(resolver: Callable[[], str]):
+    global _league_resolver
+    _league_resolver = resolver
+
+def use_league(league_id: str):
+    set_league_resolver(lambda: league_id)
+
+def current_league() -> str:
+    return _league_resolver()
+
+def get_db() -> database.DatabaseManager:
+    """The current league's database."""
+    return database.get_db(current_league())
+
+def list_leagues() -> List[str]:
+    return database.list_leagues()
+
+def create_league(name: str) -> str:
+    """Create a league (or open the existing one) from a display name. Returns its id."""
+    league_id = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:40].strip("-")
+    if not league_id:
+        raise ValueError("League name needs at least one letter or digit")
+    database.get_db(league_id)
+    return league_id
+
+# --- Read Cache ---
+# Process-wide (shared by all Streamlit sessions), per league, keyed on the
+# league's DB generation counter that every write bumps. Values are stored
+# deep-frozen so a view can never mutate the shared copy; mutable callers get
+# a thawed copy.
+_cache: Dict[tuple, tuple] = {}
+_session_indexes: Dict[str, SessionIndex] = {}
+_player_indexes: Dict[str, PlayerIndex] = {}
+_history_snapshots: Dict[str, history_snapshot.HistorySnapshot] = {}
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+def thaw(obj):
+    """Deep mutable copy of a cached (frozen) value."""
+    if isinstance(obj, MappingProxyType):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [thaw(v) for v in obj]
+    return obj
+
+def _cached(name: str, loader: Callable[[], Any]):
+    key = (current_league(), name)
+    # Read the generation before the data: a concurrent write can then only
+    # make the entry look older than it is, never newer.
+    generation = get_db().generation()
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+    value = _freeze(loader())
+    _cache[key] = (generation, value)
+    return value
+
+def invalidate_cache():
+    """Drop everything cached for the current league."""
+    league = current_league()
+    for key in [k for k in _cache if k[0] == league]:
+        del _cache[key]
+    _session_indexes.pop(league, None)
+    _player_indexes.pop(league, None)
+    _history_snapshots.pop(league, None)
 
 def load_players() -> List[Dict]:
-    return db.get_all_players()
+    """Read-only (frozen) player list."""
+    return _cached('players', get_db().get_all_players)
+
+def load_player_index() -> PlayerIndex:
+    """PlayerIndex (id lookups, name search) for the current players. Built once per version and shared."""
+    players = load_players()
+    league = current_league()
+    index = _player_indexes.get(league)
+    if index is None or index.source is not players:
+        index = _player_indexes[league] = PlayerIndex(players)
+    return index
 
 def save_players(players: List[Dict]):
-    db.bulk_save_players(players)
+    """Replace the whole player table (imports/migrations only)."""
+    get_db().bulk_save_players(players)
+
+def upsert_player(player: Dict):
+    get_db().upsert_player(player)
+
+def delete_player(player_id: str):
+    get_db().delete_player(player_id)
+
+def save_player_changes(old_players: List[Dict], new_players: List[Dict]):
+    """Write only the players that were added, renamed or removed."""
+    old_by_id = {p['id']: p for p in old_players}
+    new_ids = set()
+    for p in new_players:
+        new_ids.add(p['id'])
+        old = old_by_id.get(p['id'])
+        if old is None or old['name'] != p['name']:
+            get_db().upsert_player(p)
+    for pid in old_by_id:
+        if pid not in new_ids:
+            get_db().delete_player(pid)
 
 def load_matches_history() -> List[Dict]:
-    return db.get_all_matches()
+    """Read-only (frozen) match history."""
+    return _cached('matches', get_db().get_all_matches)
+
+def load_player_matches(player_id: str) -> List[Dict]:
+    return get_db().get_player_matches(player_id)
+
+def head_to_head(player_a: str, player_b: str) -> Dict[str, Dict[str, int]]:
+    """
+    `player_a`'s finished-match record against `player_b` and as their
+    teammate: {'against': {...}, 'together': {...}}, each with games, wins,
+    draws, losses and gd.
+    """
+    snap = load_history_snapshot()
+    if snap is not None:
+        return snap.head_to_head(player_a, player_b)
+    record = {label: {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'gd': 0} for label in ('against', 'together')}
+    for m in load_player_matches(player_a):
+        if not m.get('is_complete'):
+            continue
+        side_a = 'A' if player_a in m['team_a_players'] else 'B'
+        if player_b in m['team_a_players']:
+            side_b = 'A'
+        elif player_b in m['team_b_players']:
+            side_b = 'B'
+        else:
+            continue
+        gd = (m['score_a'] - m['score_b']) * (1 if side_a == 'A' else -1)
+        row = record['together' if side_a == side_b else 'against']
+        row['games'] += 1
+        row['wins' if gd > 0 else 'losses' if gd < 0 else 'draws'] += 1
+        row['gd'] += gd
+    return record
 
 def save_matches_history(matches: List[Dict]):
-    db.save_matches(matches)
+    get_db().save_matches(matches)
+
+def finish_jornada(completed: List[Dict], teams: Optional[List[Dict]] = None) -> int:
+    """Append completed matches to history and update player stats atomically."""
+    if teams:
+        # Session teams are discarded after the jornada; keep their names on the matches
+        names = {t['id']: t['name'] for t in teams}
+        for m in completed:
+            m['team_a_name'] = names.get(m.get('team_a_id'))
+            m['team_b_name'] = names.get(m.get('team_b_id'))
+    appended = get_db().append_matches(completed)
+    # Fold just the new jornada into the ratings
+    rating_engine.refresh_ratings(get_db())
+    # Write the new history's snapshot now rather than on the next analysis
+    load_history_snapshot()
+    return appended
+
+def load_history_snapshot() -> Optional[history_snapshot.HistorySnapshot]:
+    """
+    Memory-mapped columnar snapshot of the history (see utils/snapshot.py),
+    rebuilt when stale and shared until finished matches change. None
+    without NumPy.
+    """
+    league = current_league()
+    snap = history_snapshot.load(get_db(), _history_snapshots.get(league))
+    if snap is not None:
+        _history_snapshots[league] = snap
+    return snap
+
+def load_ratings() -> Dict[str, Dict]:
+    """Stored player ratings, caught up with any jornadas not yet processed (read-only)."""
+    return _cached('ratings', lambda: rating_engine.refresh_ratings(get_db()))
+
+def rebuild_ratings() -> Dict[str, Dict]:
+    return rating_engine.refresh_ratings(get_db(), rebuild=True, snapshot=load_history_snapshot())
+
+def load_matches_page(limit: int = 20, after: Optional[tuple] = None, **filters) -> tuple:
+    """One keyset-paginated page of history: (matches, cursor for the next page)."""
+    return get_db().get_matches_page(limit, after, **filters)
+
+def load_history_filters() -> Dict[str, List]:
+    return _cached('history_filters', get_db().get_history_filters)
+
+def load_player_stats() -> Dict[str, Dict]:
+    """Read-only (frozen) stored player stats."""
+    return _cached('player_stats', get_db().get_player_stats)
+
+def rebuild_player_stats() -> Dict[str, Dict]:
+    return get_db().rebuild_player_stats()
+
+class LoadedSession(dict):
+    """Mutable session copy that remembers the stored state it was loaded from."""
+    baseline = None
+
+# --- Jornada Windows ---
+WINDOW_ALL_TIME = "All-time (live)"
+WINDOW_SEASON = "This season"
+WINDOW_LAST_5 = "Last 5 jornadas"
+WINDOW_AS_OF = "As of jornada..."
+STANDINGS_WINDOWS = [WINDOW_ALL_TIME, WINDOW_SEASON, WINDOW_LAST_5, WINDOW_AS_OF]
+
+def load_jornadas() -> List[Dict]:
+    """Finished jornadas, newest first (read-only)."""
+    return _cached('jornadas', get_db().get_jornadas)
 
-def load_current_session() -> Dict:
-    return db.get_session()
+def load_jornada_snapshot(jornada_id: Optional[int]) -> Dict[str, Dict]:
+    """Cumulative player stats as of a jornada (read-only)."""
+    return _cached(f'snapshot:{jornada_id}', lambda: get_db().get_jornada_snapshot(jornada_id))
 
-def save_current_session(session: Dict):
-    db.save_session(session)
+def load_window_stats(window: str, jornada_id: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Player stats for a finished-jornada window, from at most two snapshot
+    lookups: as of a jornada, the last 5 jornadas, or this season
+    (calendar year of the latest jornada).
+    """
+    jornadas = load_jornadas()
+    if not jornadas:
+        return {}
+    latest = jornadas[0]
+    if window == WINDOW_AS_OF:
+        return thaw(load_jornada_snapshot(jornada_id if jornada_id is not None else latest['id']))
+
+    if window == WINDOW_LAST_5:
+        before = jornadas[5]['id'] if len(jornadas) > 5 else None
+    elif window == WINDOW_SEASON:
+        season_start = latest['played_on'][:4] + "-01-01"
+        before = next((j['id'] for j in jornadas if j['played_on'] < season_start), None)
+    else:
+        raise ValueError(f"Unknown standings window: {window}")
+    return subtract(load_jornada_snapshot(latest['id']), load_jornada_snapshot(before))
+
+@instrumentation.instrumented()
+def calculate_window_leaderboard(players: List[Dict], window: str, jornada_id: Optional[int] = None,
+                                 ratings: Optional[Dict[str, Dict]] = None) -> "pd.DataFrame":
+    return _leaderboard_frame(players, load_window_stats(window, jornada_id), ratings)
+
+def load_current_session(mutable: bool = True) -> Optional[Dict]:
+    """
+    The live session. Views that edit it in place get their own copy;
+    mutable=False returns the shared read-only one.
+    """
+    session = _cached('session', get_db().get_session)
+    if mutable and session is not None:
+        loaded = LoadedSession(thaw(session))
+        loaded.baseline = session
+        return loaded
+    return session
+
+def save_current_session(session: Dict) -> Dict:
+    """
+    Write the teams and matches that changed since the session was loaded.
+    Matches saved by someone else in the meantime are merged field by field;
+    the result's 'conflicts' lists the ids of matches where the other save won.
+    """
+    baseline = getattr(session, 'baseline', None)
+    result = get_db().save_session(session, baseline)
+    if isinstance(session, LoadedSession):
+        # Later saves of the same copy diff against the stored state, merges included
+        stored = load_current_session(mutable=False)
+        if stored is not None:
+            session.clear()
+            session.update(thaw(stored))
+        session.baseline = stored
+    return result
+
+def save_session_match(match: Dict, base: Dict) -> Dict:
+    """Save one live match edited from `base` (as loaded); same result as save_current_session."""
+    return get_db().save_session_match(match, base)
+
+def save_session_team(team: Dict) -> bool:
+    """Save one live team's name, group and players. False if it no longer exists."""
+    return get_db().save_session_team(team) > 0
+
+def load_session_index(session: Optional[Dict] = None) -> Optional[SessionIndex]:
+    """
+    SessionIndex for the stored session version that `session` was loaded
+    from (or the current one). Built once per version and shared.
+    """
+    source = getattr(session, 'baseline', None) or load_current_session(mutable=False)
+    if source is None:
+        return None
+    league = current_league()
+    index = _session_indexes.get(league)
+    if index is None or index.source is not source:
+        index = _session_indexes[league] = SessionIndex(source, load_players())
+    return index
 
 def clear_current_session():
-    db.clear_session()
+    get_db().clear_session()
+
+# --- Team Generation ---
+BALANCE_BY_RATING = "Rating"
+BALANCE_BY_POINTS = "Points per game"
+BALANCE_OPTIONS = [BALANCE_BY_RATING, BALANCE_BY_POINTS]
+
+def load_checked_in() -> List[str]:
+    """Ids of the players checked in for the next jornada (read-only)."""
+    return _cached('checked_in', get_db().get_checked_in)
+
+def save_checked_in(player_ids: List[str]):
+    get_db().set_checked_in(player_ids)
+
+def load_last_teammates() -> List[tuple]:
+    """Pairs of players who were teammates in the latest finished jornada (read-only)."""
+    jornadas = load_jornadas()
+    if not jornadas:
+        return []
+    latest = jornadas[0]['id']
+    return _cached(f'teammates:{latest}', lambda: get_db().get_jornada_teammates(latest))
+
+def player_strengths(player_ids: List[str], basis: str = BALANCE_BY_RATING) -> Dict[str, float]:
+    """Rating (base rating without games) or all-time points per game played."""
+    if basis == BALANCE_BY_POINTS:
+        stats = load_player_stats()
+        return {pid: stats[pid]['Pts'] / stats[pid]['GP'] if pid in stats and stats[pid]['GP'] else 0.0
+                for pid in player_ids}
+    ratings = load_ratings()
+    base = rating_engine.DEFAULT_PARAMS['base']
+    return {pid: ratings[pid]['rating'] if pid in ratings else base for pid in player_ids}
+
+def generate_session_teams(session: Dict, player_ids: List[str], basis: str = BALANCE_BY_RATING,
+                           seed: Optional[int] = None) -> Dict:
+    """
+    Fill the session's teams (in place) with balanced teams of three drawn
+    from `player_ids`, avoiding last jornada's teammates. Returns the
+    team_generator result ('bench', 'spread', 'repeats', ...).
+    """
+    result = team_generator.generate_teams(
+        player_ids, player_strengths(player_ids, basis), len(session['teams']),
+        previous_teammates=load_last_teammates(), seed=seed
+    )
+    players_by_id = {p['id']: p for p in load_players()}
+    session_manager.assign_generated_teams(session['teams'], result['teams'], players_by_id)
+    return result
+
+# --- Fixtures ---
+# Meetings between players over this many recent jornadas count against a pairing
+RECENT_JORNADAS = 3
+
+def load_recent_opponents() -> Dict[tuple, int]:
+    """{(player, player): meetings} over the last RECENT_JORNADAS jornadas, pairs sorted (read-only)."""
+    jornadas = load_jornadas()
+    if not jornadas:
+        return {}
+    after = jornadas[RECENT_JORNADAS]['id'] if len(jornadas) > RECENT_JORNADAS else 0
+
+    def build():
+        counts = {}
+        for a, b, n in get_db().get_opponent_counts(after):
+            key = (a, b) if a < b else (b, a)
+            counts[key] = counts.get(key, 0) + n
+        return counts
+    return _cached(f'opponents:{after}', build)
+
+def schedule_session_matches(session: Dict, seed: Optional[int] = None) -> int:
+    """
+    Fill every match slot of the session (in place) with a round-robin
+    schedule per group, preferring pairings whose players have not met
+    recently. Teams without players (e.g. left over by Generate Teams) are
+    left out, and slots their fixtures would take stay blank. Returns the
+    number of slots filled.
+    """
+    recent = load_recent_opponents()
+    teams = [t for t in session['teams'] if t.get('players')]
+    players_by_team = {t['id']: t['players'] for t in teams}
 
-def get_db_binary():
-    """Return database file bytes for download."""
-    with open(DB_FILE, 'rb') as f:
+    def pair_penalty(team_a: str, team_b: str) -> float:
+        return sum(recent.get((a, b) if a < b else (b, a), 0)
+                   for a in players_by_team[team_a] for b in players_by_team[team_b])
+    return session_manager.assign_fixtures(session['matches'], teams, pair_penalty if recent else None, seed)
+
+# --- Change Feed ---
+# Live views re-run on this timer. Every load_* call starts with one read of
+# the generation counter and only touches other tables when it has moved.
+LIVE_REFRESH_SECONDS = 5
+
+def _backup_dir() -> str:
+    # Next to the league's database (data/backups for the default league)
+    return os.path.join(os.path.dirname(get_db().db_path), "backups")
+
+def _clear_backups(keep: Optional[str] = None):
+    """Remove finished backups other than `keep` (another request's *.tmp files are still being written)."""
+    backup_dir = _backup_dir()
+    if not os.path.isdir(backup_dir):
+        return
+    for name in os.listdir(backup_dir):
+        if name != keep and name.startswith("app-") and name.endswith(".db.gz"):
+            try:
+                os.remove(os.path.join(backup_dir, name))
+            except FileNotFoundError:
+                pass # removed by a concurrent request
+
+def prepare_db_backup() -> str:
+    """
+    Path of a gzip-compressed backup of the database, taken with SQLite's
+    online backup and streamed through gzip on disk. The file is reused
+    until the next write changes the generation.
+    """
+    backup_dir = _backup_dir()
+    name = f"app-{get_db().generation()}.db.gz"
+    path = os.path.join(backup_dir, name)
+    if os.path.exists(path):
+        return path
+    os.makedirs(backup_dir, exist_ok=True)
+    fd, raw = tempfile.mkstemp(dir=backup_dir, suffix='.db.tmp')
+    os.close(fd)
+    try:
+        get_db().backup_to(raw)
+        fd, packed = tempfile.mkstemp(dir=backup_dir, suffix='.gz.tmp')
+        with open(raw, 'rb') as src, os.fdopen(fd, 'wb') as out, gzip.GzipFile(filename='app.db', mode='wb', fileobj=out) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(packed, path)
+    finally:
+        os.remove(raw)
+    _clear_backups(keep=name)
+    return path
+
+def get_db_backup() -> bytes:
+    """Compressed backup bytes for download (prepared on demand)."""
+    with open(prepare_db_backup(), 'rb') as f:
         return f.read()
 
-def restore_db_from_binary(file_bytes):
-    """Overwrite database file with provided bytes."""
-    with open(DB_FILE, 'wb') as f:
-        f.write(file_bytes)
-    # Re-init migration check or reload not strictly needed as next DB call reads file
+def restore_db_from_file(fileobj):
+    """
+    Restore the current league's database from an uploaded .db or .db.gz file object. The upload
+    is streamed to a scratch file next to the database, validated, and only
+    then swapped in atomically; a bad file leaves the live database untouched.
+    """
+    fd, scratch = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(get_db().db_path)), suffix='.restore')
+    try:
+        fileobj.seek(0)
+        compressed = fileobj.read(2) == GZIP_MAGIC
+        fileobj.seek(0)
+        with os.fdopen(fd, 'wb') as out:
+            src = gzip.GzipFile(fileobj=fileobj, mode='rb') if compressed else fileobj
+            shutil.copyfileobj(src, out)
+        # Migrates files from older versions of the app
+        get_db().restore_from(scratch)
+    finally:
+        # The upload is migrated in place first, which may leave its WAL files behind on failure
+        for leftover in (scratch, scratch + '-wal', scratch + '-shm'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    # The restored file has its own generation counter (and history stamp, so the snapshot rebuilds)
+    _clear_backups()
+    invalidate_cache()
 
 
-def calculate_leaderboard(players: List[Dict], matches: List[Dict]) -> pd.DataFrame:
-    # Initialize stats for all players
-    stats = {p['id']: {'Name': p['name'], 'Pts': 0, 'GP': 0, 'W': 0, 'D': 0, 'L': 0, 'GD': 0} for p in players}
-    
-    # Process matches
-    for m in matches:
-        if not m.get('is_complete', False):
-            continue
-            
-        team_a_ids = m['team_a_players']
-        team_b_ids = m['team_b_players']
-        score_a = int(m['score_a'])
-        score_b = int(m['score_b'])
-        
-        # Determine result
-        if score_a > score_b:
-            res_a, res_b = 'W', 'L'
-            pts_a, pts_b = 3, 0
-        elif score_a < score_b:
-            res_a, res_b = 'L', 'W'
-            pts_a, pts_b = 0, 3
-        else:
-            res_a, res_b = 'D', 'D'
-            pts_a, pts_b = 1, 1
-            
-        gd_a = score_a - score_b
-        gd_b = score_b - score_a
-        
-        # Update stats for Team A players
-        for pid in team_a_ids:
-            if pid in stats:
-                stats[pid]['GP'] += 1
-                stats[pid]['GD'] += gd_a
-                stats[pid]['Pts'] += pts_a
-                if res_a == 'W': stats[pid]['W'] += 1
-                elif res_a == 'D': stats[pid]['D'] += 1
-                else: stats[pid]['L'] += 1
-                
-        # Update stats for Team B players
-        for pid in team_b_ids:
-            if pid in stats:
-                stats[pid]['GP'] += 1
-                stats[pid]['GD'] += gd_b
-                stats[pid]['Pts'] += pts_b
-                if res_b == 'W': stats[pid]['W'] += 1
-                elif res_b == 'D': stats[pid]['D'] += 1
-                else: stats[pid]['L'] += 1
-
-    df = pd.DataFrame(stats.values())
+def _rank(df: "pd.DataFrame") -> "pd.DataFrame":
     if not df.empty:
         # Sort desc by Pts, GD, W
         df = df.sort_values(by=['Pts', 'GD', 'W'], ascending=False).reset_index(drop=True)
         df.index += 1 # Rank starts at 1
     return df
+
+def _leaderboard_frame(players: List[Dict], stats: Dict[str, Dict],
+                       ratings: Optional[Dict[str, Dict]] = None) -> "pd.DataFrame":
+    rows = {p['id']: {'Name': p['name'], **empty_stats()} for p in players}
+    for pid, row in rows.items():
+        if pid in stats:
+            row.update({k: stats[pid][k] for k in STAT_KEYS})
+        if ratings is not None:
+            rating = ratings.get(pid)
+            row['Rating'] = round(rating['rating'] if rating else rating_engine.DEFAULT_PARAMS['base'], 1)
+    import pandas as pd
+    return _rank(pd.DataFrame(rows.values()))
+
+def calculate_leaderboard_reference(players: List[Dict], matches: List[Dict]) -> "pd.DataFrame":
+    """Pure-Python full recompute; the reference the vectorized engine must match."""
+    # Initialize stats for all players
+    stats = {p['id']: empty_stats() for p in players}
+    accumulate(stats, matches, only_known=True)
+    return _leaderboard_frame(players, stats)
+
+@instrumentation.instrumented()
+def calculate_leaderboard(players: List[Dict], matches: List[Dict]) -> "pd.DataFrame":
+    """Full recompute of the leaderboard from a list of matches."""
+    # Same id de-duplication as the reference: first position, last name wins
+    names = {p['id']: p['name'] for p in players}
+    arrays = aggregate_arrays(list(names), matches) if names else None
+    if arrays is None:
+        return calculate_leaderboard_reference(players, matches)
+    import pandas as pd
+    return _rank(pd.DataFrame({'Name': list(names.values()), **arrays}))
+
+@instrumentation.instrumented()
+def calculate_history_leaderboard(players: List[Dict]) -> "pd.DataFrame":
+    """
+    Full recompute over all finished matches, from the memory-mapped history
+    snapshot when NumPy is available (no match is decoded into a dict).
+    """
+    snap = load_history_snapshot()
+    if snap is None:
+        return calculate_leaderboard(players, load_matches_history())
+    names = {p['id']: p['name'] for p in players}
+    import pandas as pd
+    return _rank(pd.DataFrame({'Name': list(names.values()), **snap.player_stats(list(names))}))
+
+@instrumentation.instrumented()
+def calculate_live_leaderboard(players: List[Dict], live_matches: List[Dict],
+                               ratings: Optional[Dict[str, Dict]] = None) -> "pd.DataFrame":
+    """
+    Leaderboard from the stored player stats, with the live session's
+    matches layered on top as a delta.
+    """
+    stats = thaw(load_player_stats())
+    known = {p['id'] for p in players}
+    delta = accumulate({}, live_matches)
+    for pid, row in delta.items():
+        if pid not in known:
+            continue
+        base = stats.setdefault(pid, empty_stats())
+        for k in STAT_KEYS:
+            base[k] += row[k]
+    return _leaderboard_frame(players, stats, ratings)
+
+@instrumentation.instrumented()
+def load_leaderboard(window: str = WINDOW_ALL_TIME, jornada_id: Optional[int] = None) -> "pd.DataFrame":
+    """
+    Standings with ratings for a window, built once per generation and shared
+    by every open browser. The all-time window includes the live session.
+    Treat the frame as read-only.
+    """
+    def build():
+        players = load_players()
+        ratings = load_ratings()
+        if window == WINDOW_ALL_TIME:
+            session = load_current_session(mutable=False)
+            return calculate_live_leaderboard(players, session['matches'] if session else (), ratings)
+        return calculate_window_leaderboard(players, window, jornada_id, ratings)
+    return _cached(f'leaderboard:{window}:{jornada_id}', build)
@@ -0,0 +1,208 @@
+"""
+Timing and counting of database calls, view renders and leaderboard builds,
+aggregated per rerun, per browser session and per process.
+
+Per name (e.g. "db.get_session", "leaderboard_view.render_standings"):
+
+    calls       times called
+    seconds     wall time, inclusive of nested instrumented calls; for
+                iterators, from the call until exhausted
+    queries     statements run through DatabaseManager's generic helpers
+                (execute_query, fetch_one, fetch_all, iter_query)...
+    rows        ...and the rows they returned
+    json_bytes  JSON text decoded
+    checkouts   pooled database connections checked out...
+    opened      ...and of those, newly opened (0 once the pool is warm)
+
+Queries, rows, JSON bytes and connections go to the innermost instrumented call running
+on the thread, so they add up without double counting; seconds nest.
+
+Every call counts toward the process totals. While a trace is open on the
+thread (app.py opens one per rerun; a fragment re-running on its own opens
+one through its render function), it also counts toward that trace, which
+is handed to the registered sink when it closes.
+"""
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+FIELDS = ('calls', 'seconds', 'queries', 'rows', 'json_bytes', 'checkouts', 'opened')
+# Counts made outside any instrumented call
+UNATTRIBUTED = "unattributed"
+
+class Stats:
+    """Metrics by name: {name: {field: value}}."""
+    def __init__(self):
+        self.data: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, **values):
+        row = self.data.get(name)
+        if row is None:
+            row = self.data[name] = dict.fromkeys(FIELDS, 0)
+        for field, value in values.items():
+            row[field] = row.get(field, 0) + value
+
+    def merge(self, other: "Stats"):
+        for name, row in other.data.items():
+            self.add(name, **row)
+
+    def copy(self) -> "Stats":
+        stats = Stats()
+        stats.merge(self)
+        return stats
+
+    def rows(self):
+        """Rows for display, slowest first."""
+        return [{'name': name, **row} for name, row in sorted(self.data.items(), key=lambda kv: -kv[1]['seconds'])]
+
+    def total(self, field: str) -> float:
+        return sum(row[field] for row in self.data.values())
+
+class Trace(Stats):
+    """Metrics of one rerun (or fragment rerun)."""
+    def __init__(self, label: str):
+        super().__init__()
+        self.label = label
+        self.started = time.time()
+        self.seconds = 0.0
+
+_local = threading.local()
+_totals = Stats()
+_totals_lock = threading.Lock()
+_sink: Optional[Callable[[Trace], None]] = None
+
+def set_sink(sink: Optional[Callable[[Trace], None]]):
+    """Where finished traces go (app.py: the browser session's diagnostics)."""
+    global _sink
+    _sink = sink
+
+def process_totals() -> Stats:
+    with _totals_lock:
+        return _totals.copy()
+
+def _record(name: str, **values):
+    with _totals_lock:
+        _totals.add(name, **values)
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(name, **values)
+
+def _stack() -> list:
+    """Labels of the instrumented calls running on this thread, innermost last."""
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def count(**values):
+    """Add queries, rows or json_bytes to the innermost instrumented call."""
+    stack = _stack()
+    _record(stack[-1] if stack else UNATTRIBUTED, **values)
+
+@contextmanager
+def trace(label: str):
+    """Collect everything the thread records into one Trace (reused when one is already open)."""
+    current = getattr(_local, 'trace', None)
+    if current is not None:
+        yield current
+        return
+    current = _local.trace = Trace(label)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        _local.trace = None
+        if _sink is not None:
+            _sink(current)
+
+def _iterate(name: str, iterator, start: float):
+    """Run a generator's body under `name` each time it resumes, so its counts land there."""
+    try:
+        while True:
+            stack = _stack()
+            stack.append(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stack.pop()
+            yield item
+    finally:
+        iterator.close()
+        _record(name, seconds=time.perf_counter() - start)
+
+def instrumented(name: Optional[str] = None, root: bool = False):
+    """
+    Decorator recording calls and wall time under `name` (default
+    "<module>.<function>"). With `root`, a call made outside any trace opens
+    one, so fragments re-running on their own are traced too.
+    """
+    def decorate(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if root and getattr(_local, 'trace', None) is None:
+                with trace(label):
+                    return wrapper(*args, **kwargs)
+            stack = _stack()
+            stack.append(label)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                stack.pop()
+            if inspect.isgenerator(result):
+                _record(label, calls=1)
+                return _iterate(label, result, start)
+            _record(label, calls=1, seconds=time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorate
+
+def instrument_methods(cls, prefix: str, skip=()):
+    """Wrap every public method defined on `cls` (not static or class methods) with `instrumented`."""
+    for attr, value in list(vars(cls).items()):
+        if inspect.isfunction(value) and not attr.startswith('_') and attr not in skip:
+            setattr(cls, attr, instrumented(f"{prefix}{attr}")(value))
+
+# --- Export ---
+def to_json(**sections: Stats) -> str:
+    """Sections (e.g. rerun=..., session=..., process=...) as one JSON document."""
+    out = {}
+    for key, stats in sections.items():
+        if stats is None:
+            continue
+        section = {'metrics': stats.data}
+        if isinstance(stats, Trace):
+            section.update(label=stats.label, started=stats.started, seconds=stats.seconds)
+        out[key] = section
+    return json.dumps(out, indent=2, sort_keys=True)
+
+_PROMETHEUS_HELP = {
+    'calls': "Instrumented calls.",
+    'seconds': "Wall time of instrumented calls, inclusive of nested ones.",
+    'queries': "Statements run through the database helpers.",
+    'rows': "Rows returned by the database helpers.",
+    'json_bytes': "Bytes of JSON text decoded.",
+    'checkouts': "Pooled database connections checked out.",
+    'opened': "Database connections opened.",
+}
+
+def to_prometheus(stats: Stats, prefix: str = "app") -> str:
+    """Prometheus text exposition format: one counter family per field, labelled by name."""
+    lines = []
+    for field in FIELDS:
+        metric = f"{prefix}_{field}_total"
+        lines.append(f"# HELP {metric} {_PROMETHEUS_HELP[field]}")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(stats.data):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{metric}{{name="{label}"}} {stats.data[name][field]}')
+    return "\n".join(lines) + "\n"
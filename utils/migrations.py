@@ -0,0 +1,138 @@
+"""
+Versioned schema migrations.
+
+PRAGMA user_version holds the number of the last migration applied to a
+database. Opening an up-to-date database costs one pragma read; otherwise the
+pending steps run in order, in a single write transaction, and the version is
+bumped after each. Steps must be idempotent so databases created before
+versioning (user_version 0, in any earlier layout) upgrade cleanly.
+
+Usage:
+    python -m utils.migrations status
+    python -m utils.migrations run
+"""
+import json
+import os
+import sqlite3
+import sys
+from typing import List, Tuple, Callable
+
+def _base_schema(db, cursor):
+    db._create_schema(cursor)
+
+def _import_legacy_json(db, cursor):
+    """Import the pre-SQLite JSON files into tables that are still empty."""
+    data_dir = os.path.dirname(db.db_path)
+
+    def load(name):
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Migration error ({name}): {e}")
+            return None
+
+    if not cursor.execute("SELECT 1 FROM players LIMIT 1").fetchone():
+        legacy_players = load("players.json")
+        if legacy_players:
+            db.bulk_save_players(legacy_players)
+            print("Migrated players from JSON to DB.")
+
+    if not cursor.execute("SELECT 1 FROM matches LIMIT 1").fetchone():
+        legacy_matches = load("matches_history.json")
+        if legacy_matches:
+            db.save_matches(legacy_matches)
+            print("Migrated matches from JSON to DB.")
+
+    if not cursor.execute("SELECT 1 FROM session WHERE key = 'current_session'").fetchone():
+        legacy_session = load("current_session.json")
+        if legacy_session:
+            db.save_session(legacy_session)
+            print("Migrated session from JSON to DB.")
+
+def _backfill_jornadas(db, cursor):
+    db.ensure_jornadas()
+
+def _materialize_player_stats(db, cursor):
+    db.ensure_player_stats()
+
+def _session_match_versions(db, cursor):
+    """Per-match version numbers for compare-and-swap saves of the live session."""
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(session_matches)")]
+    if 'version' not in columns:
+        cursor.execute("ALTER TABLE session_matches ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+# (version, description, step). Append new steps; never reorder or renumber.
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "base schema", _base_schema),
+    (2, "import legacy JSON files", _import_legacy_json),
+    (3, "tag matches with jornadas", _backfill_jornadas),
+    (4, "materialize player stats", _materialize_player_stats),
+    (5, "version session matches", _session_match_versions),
+]
+LATEST = MIGRATIONS[-1][0]
+
+def user_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def pending(version: int) -> List[Tuple[int, str, Callable]]:
+    return [m for m in MIGRATIONS if m[0] > version]
+
+def migrate(db, legacy_import: bool = True) -> List[str]:
+    """
+    Bring `db` (a DatabaseManager) up to the latest version. Returns the steps
+    applied. Without `legacy_import` the JSON files next to the database are
+    not read (e.g. for an uploaded backup, which must not pick up this
+    league's files); the step still counts as applied.
+    """
+    with db._get_connection() as conn:
+        if user_version(conn) >= LATEST:
+            return []
+        # Take the write lock, then re-check: another process may have just migrated
+        conn.execute("BEGIN IMMEDIATE")
+        applied = []
+        for version, description, step in pending(user_version(conn)):
+            if legacy_import or step is not _import_legacy_json:
+                step(db, conn.cursor())
+                applied.append(description)
+            conn.execute(f"PRAGMA user_version = {version}")
+        return applied
+
+def main():
+    import argparse
+    from utils.database import DB_FILE, DatabaseManager
+
+    parser = argparse.ArgumentParser(prog="python -m utils.migrations", description="Inspect or apply schema migrations.")
+    parser.add_argument("command", choices=["status", "run"])
+    parser.add_argument("--db", default=DB_FILE, help=f"database file (default: {DB_FILE})")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        if not os.path.exists(args.db):
+            print(f"{args.db} does not exist; all {LATEST} migrations pending.")
+            return 0
+        conn = sqlite3.connect(args.db)
+        try:
+            version = user_version(conn)
+        finally:
+            conn.close()
+        print(f"{args.db}: version {version} of {LATEST}")
+        for number, description, _ in MIGRATIONS:
+            print(f"  [{'x' if number <= version else ' '}] {number}. {description}")
+        return 0
+
+    manager = DatabaseManager(args.db, migrate=False)
+    try:
+        applied = migrate(manager)
+    finally:
+        manager.close()
+    for description in applied:
+        print(f"Applied: {description}")
+    print(f"{args.db}: up to date (version {LATEST})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+from bisect import bisect_left
+from typing import List, Dict, Optional, Collection
+
+class PlayerIndex:
+    """
+    Id-keyed lookups and name search for one version of the player list,
+    built once and shared by views. Treat as read-only.
+
+    Search matches each query word against the start of a word in the name
+    ("ti o" finds "Tim O"), via bisect over a sorted word list, and falls
+    back to substring matches when that finds too few.
+    """
+    def __init__(self, players: List[Dict]):
+        self.source = players
+        self.by_id = {p['id']: p for p in players}
+        self.ordered_ids = [p['id'] for p in sorted(players, key=lambda p: (p['name'].lower(), p['id']))]
+        self._rank = {pid: i for i, pid in enumerate(self.ordered_ids)}
+        self._words = sorted((word, p['id']) for p in players for word in p['name'].lower().split())
+
+        # Same-name players get a short id suffix so they can be told apart
+        counts = {}
+        for p in players:
+            counts[p['name']] = counts.get(p['name'], 0) + 1
+        self.labels = {p['id']: p['name'] if counts[p['name']] == 1 else f"{p['name']} ({p['id'][:6]})" for p in players}
+
+    def label(self, player_id: str) -> str:
+        return self.labels.get(player_id, player_id)
+
+    def names(self, player_ids) -> List[str]:
+        return [self.by_id[pid]['name'] for pid in player_ids if pid in self.by_id]
+
+    def _prefix_ids(self, prefix: str) -> set:
+        ids = set()
+        i = bisect_left(self._words, (prefix,))
+        while i < len(self._words) and self._words[i][0].startswith(prefix):
+            ids.add(self._words[i][1])
+            i += 1
+        return ids
+
+    def search(self, query: str = "", limit: int = 50, within: Optional[Collection[str]] = None,
+               exclude: Collection[str] = ()) -> List[str]:
+        """
+        Up to `limit` player ids matching `query` (all players when empty),
+        by name. `within` restricts the candidates (e.g. checked-in players);
+        `exclude` drops some (e.g. already assigned).
+        """
+        def allowed(pid):
+            return pid not in exclude and (within is None or pid in within)
+
+        terms = query.lower().split()
+        if not terms:
+            # Walk the smaller of the two candidate sets
+            if within is not None and len(within) < len(self.ordered_ids):
+                pool = sorted((pid for pid in within if pid in self._rank), key=self._rank.get)
+            else:
+                pool = self.ordered_ids
+            found = []
+            for pid in pool:
+                if allowed(pid):
+                    found.append(pid)
+                    if len(found) == limit:
+                        break
+            return found
+
+        matches = set.intersection(*(self._prefix_ids(t) for t in terms))
+        found = sorted((pid for pid in matches if allowed(pid)), key=self._rank.get)
+        if len(found) < limit:
+            needle = query.lower().strip()
+            seen = set(found)
+            found += [pid for pid in self.ordered_ids
+                      if pid not in seen and needle in self.by_id[pid]['name'].lower() and allowed(pid)]
+        return found[:limit]
@@ -0,0 +1,83 @@
+import json
+from typing import List, Dict, Iterable, Optional
+
+# Elo parameters. Changing any of them triggers a full deterministic replay.
+DEFAULT_PARAMS = {
+    'base': 1000.0,   # rating of a player with no games
+    'k': 24.0,        # points at stake per match
+    'scale': 400.0,   # rating gap at which the stronger side is a 10:1 favourite
+}
+
+def params_fingerprint(params: Dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+def expected_score(rating_a: float, rating_b: float, scale: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / scale))
+
+def apply_matches(ratings: Dict[str, float], games: Dict[str, int], matches: Iterable[Dict],
+                  params: Dict = DEFAULT_PARAMS) -> set:
+    """
+    Update `ratings` and `games` in place from completed matches, in order.
+    A team's rating is the mean of its members'; every member of a side
+    gains or loses the same Elo delta. Returns the ids of players touched.
+    """
+    base, k, scale = params['base'], params['k'], params['scale']
+    touched = set()
+    for m in matches:
+        if not m.get('is_complete', False):
+            continue
+        team_a = m['team_a_players']
+        team_b = m['team_b_players']
+        if not team_a or not team_b:
+            continue
+
+        rating_a = sum(ratings.get(p, base) for p in team_a) / len(team_a)
+        rating_b = sum(ratings.get(p, base) for p in team_b) / len(team_b)
+        score_a, score_b = int(m['score_a']), int(m['score_b'])
+        actual = 1.0 if score_a > score_b else 0.0 if score_a < score_b else 0.5
+        delta = k * (actual - expected_score(rating_a, rating_b, scale))
+
+        for pids, change in ((team_a, delta), (team_b, -delta)):
+            for p in pids:
+                ratings[p] = ratings.get(p, base) + change
+                games[p] = games.get(p, 0) + 1
+                touched.add(p)
+    return touched
+
+def replay(matches: Iterable[Dict], params: Dict = DEFAULT_PARAMS) -> Dict[str, float]:
+    """Ratings from scratch over an ordered match list (in memory, no checkpoint)."""
+    ratings = {}
+    apply_matches(ratings, {}, matches, params)
+    return ratings
+
+def refresh_ratings(db, params: Dict = DEFAULT_PARAMS, rebuild: bool = False, snapshot=None) -> Dict[str, Dict]:
+    """
+    Bring stored ratings up to date. Only jornadas after the stored checkpoint
+    are processed, unless `rebuild` is set or the parameters changed, in which
+    case all history is replayed in jornada order (over `snapshot`, a current
+    HistorySnapshot, when given). Returns the stored ratings.
+    """
+    fingerprint = params_fingerprint(params)
+    checkpoint = db.get_rating_checkpoint()
+    if rebuild or checkpoint is None or checkpoint['params'] != fingerprint:
+        since, replace = None, True
+        ratings, games = {}, {}
+        if snapshot is not None:
+            rows = snapshot.replay_ratings(params)
+            db.save_ratings(rows, snapshot.last_jornada, fingerprint)
+            return db.get_ratings()
+    else:
+        since, replace = checkpoint['jornada_id'], False
+        stored = db.get_ratings()
+        ratings = {pid: r['rating'] for pid, r in stored.items()}
+        games = {pid: r['games'] for pid, r in stored.items()}
+
+    matches = db.get_matches_since(since or 0)
+    if not matches and not replace:
+        return stored
+
+    touched = apply_matches(ratings, games, matches, params)
+    last_jornada = max((m['jornada_id'] for m in matches if m.get('jornada_id') is not None), default=since or 0)
+    rows = {pid: {'rating': ratings[pid], 'games': games[pid]} for pid in (ratings if replace else touched)}
+    db.save_ratings(rows, last_jornada, fingerprint, expected_jornada=None if replace else since)
+    return db.get_ratings()
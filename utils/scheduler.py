@@ -0,0 +1,106 @@
+import random
+from typing import List, Callable, Optional, Sequence
+
+# Team orders tried when a penalty is given (each yields a different set of rounds),
+# fewer for big groups so that at most PAIR_BUDGET pairs are scored in total
+TRIALS = 20
+PAIR_BUDGET = 200_000
+
+def circle_rounds(team_ids: Sequence[str]) -> List[List[tuple]]:
+    """
+    Round-robin rounds by the circle method: every pair meets exactly once,
+    each team at most once per round. With an odd count one team sits out
+    each round. Sides alternate from round to round.
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None) # bye
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            a, b = teams[i], teams[n - 1 - i]
+            if a is not None and b is not None:
+                pairs.append((a, b) if (r + i) % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        # Keep the first team fixed and rotate the rest one place
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+def _balance_sides(fixtures: List[tuple]) -> List[tuple]:
+    """Flip fixtures so each team is Team A about as often as Team B."""
+    as_a = {}
+    balanced = []
+    for a, b in fixtures:
+        if as_a.get(a, 0) > as_a.get(b, 0):
+            a, b = b, a
+        as_a[a] = as_a.get(a, 0) + 1
+        balanced.append((a, b))
+    return balanced
+
+def _repeats_in_round(fixtures: List[tuple], pairs: List[tuple], matches_per_round: int) -> bool:
+    """Whether appending `pairs` to `fixtures` puts a pair twice in one slot round."""
+    # A circle round never repeats a pair itself, so only the fixtures already placed matter
+    start = len(fixtures)
+    placed = {frozenset(p) for p in fixtures[start // matches_per_round * matches_per_round:]}
+    return any(frozenset(pair) in placed for pair in pairs[:matches_per_round - start % matches_per_round])
+
+def schedule_group(team_ids: Sequence[str], rounds: int, matches_per_round: Optional[int] = None,
+                   pair_penalty: Optional[Callable[[str, str], float]] = None,
+                   seed: Optional[int] = None, trials: int = TRIALS) -> List[List[tuple]]:
+    """
+    Fixtures for one group: `rounds` lists of `matches_per_round` (Team A,
+    Team B) pairs (default: every team once per round).
+
+    Matches are drawn from whole circle-method rounds, so no pair meets twice
+    until every pair has met once. When the slots need only part of a cycle,
+    or some pairs twice, the circle rounds with the lowest total
+    `pair_penalty` (e.g. recent meetings) are used; several team orders are
+    tried and the cheapest kept. Repeated meetings come last.
+    """
+    if len(team_ids) < 2 or rounds <= 0:
+        return [[] for _ in range(max(rounds, 0))]
+    if matches_per_round is None:
+        matches_per_round = len(team_ids) // 2
+    needed = rounds * matches_per_round
+
+    rng = random.Random(seed)
+    penalties = {}
+    def cost(pair):
+        key = pair if pair[0] < pair[1] else (pair[1], pair[0])
+        if key not in penalties:
+            penalties[key] = pair_penalty(*key)
+        return penalties[key]
+
+    pairs_per_cycle = len(team_ids) * (len(team_ids) - 1) // 2
+    trials = max(1, min(trials, PAIR_BUDGET // pairs_per_cycle)) if pair_penalty else 1
+
+    best = None
+    order = list(team_ids)
+    for trial in range(trials):
+        if trial:
+            rng.shuffle(order)
+        cycle = circle_rounds(order)
+        per_cycle = sum(len(r) for r in cycle)
+        full_cycles, rest = divmod(needed, per_cycle)
+        scored = [(sum(cost(p) for p in r), i) for i, r in enumerate(cycle)] if pair_penalty else [(0, i) for i in range(len(cycle))]
+
+        # Whole cycles first, then the cheapest rounds for the remainder
+        fixtures = [p for _ in range(full_cycles) for r in cycle for p in r]
+        total = sum(s for s, _ in scored) * full_cycles
+        remaining = sorted(scored)
+        while rest > 0 and remaining:
+            # Skip rounds that would repeat a pair within one slot round (e.g. the cycle's last), if any other is left
+            pick = next((e for e in remaining
+                         if not _repeats_in_round(fixtures, cycle[e[1]][:rest], matches_per_round)), remaining[0])
+            remaining.remove(pick)
+            s, i = pick
+            fixtures.extend(cycle[i][:rest])
+            total += s
+            rest -= len(cycle[i])
+        if best is None or total < best[0]:
+            best = (total, fixtures)
+
+    fixtures = _balance_sides(best[1])
+    return [fixtures[r * matches_per_round:(r + 1) * matches_per_round] for r in range(rounds)]
@@ -1,6 +1,7 @@
 import random
 import uuid
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional
+from utils import scheduler
 
 def create_teams_empty(num_teams=12) -> List[Dict]:
     """
@@ -17,6 +18,18 @@ def create_teams_empty(num_teams=12) -> List[Dict]:
         })
     return teams
 
+def assign_generated_teams(teams: List[Dict], generated: List[Dict], players_by_id: Dict[str, Dict]):
+    """
+    Fill existing team skeletons in place from team_generator output
+    (team ids and names are kept). Teams beyond the generated ones are emptied.
+    """
+    generated = sorted(generated, key=lambda t: t['group']) # Group 1 first, like create_teams_empty
+    for i, team in enumerate(teams):
+        spec = generated[i] if i < len(generated) else {'players': [], 'group': team.get('group', 'Group 1')}
+        team['players'] = list(spec['players'])
+        team['player_names'] = [players_by_id[pid]['name'] for pid in spec['players'] if pid in players_by_id]
+        team['group'] = spec['group']
+
 def init_match_slots(rounds=3, matches_per_round=6) -> List[Dict]:
     """
     Creates empty slots for manual matchmaking.
@@ -40,3 +53,60 @@ def init_match_slots(rounds=3, matches_per_round=6) -> List[Dict]:
                     'is_complete': False
                 })
     return slots
+
+def assign_fixtures(matches: List[Dict], teams: List[Dict],
+                    pair_penalty: Optional[Callable[[str, str], float]] = None, seed: Optional[int] = None) -> int:
+    """
+    Fill Team A / Team B of every match slot in place with a round-robin
+    schedule of its group's teams (see scheduler.schedule_group). Slots the
+    schedule cannot fill are left blank. Returns the number of slots filled.
+    """
+    filled = 0
+    team_ids_by_group = {}
+    for t in teams:
+        team_ids_by_group.setdefault(t.get('group', 'Group 1'), []).append(t['id'])
+
+    slots_by_group = {}
+    for m in matches:
+        slots_by_group.setdefault(m.get('group', 'Group 1'), {}).setdefault(m['round'], []).append(m)
+    for group, slots_by_round in slots_by_group.items():
+        rounds = sorted(slots_by_round)
+        per_round = max(len(slots) for slots in slots_by_round.values())
+        fixtures = scheduler.schedule_group(team_ids_by_group.get(group, []), len(rounds), per_round, pair_penalty, seed)
+        for r, fixtures_in_round in zip(rounds, fixtures):
+            slots = sorted(slots_by_round[r], key=lambda m: m['match_num'])
+            for i, slot in enumerate(slots):
+                slot['team_a_id'], slot['team_b_id'] = fixtures_in_round[i] if i < len(fixtures_in_round) else (None, None)
+                filled += i < len(fixtures_in_round)
+    return filled
+
+class SessionIndex:
+    """
+    Lookup tables for one version of a session, built once and shared by views.
+    Treat as read-only. Match buckets hold positions into session['matches'],
+    so a view resolves them against its own mutable copy of the same version.
+    """
+    def __init__(self, session: Dict, players: List[Dict]):
+        self.source = session
+        teams = session.get('teams', [])
+        matches = session.get('matches', [])
+
+        self.teams_by_id = {t['id']: t for t in teams}
+        self.team_labels = {t['id']: f"{t['name']} ({t['group']})" for t in teams}
+        self.team_ids_by_group = {}
+        for t in teams:
+            self.team_ids_by_group.setdefault(t.get('group', 'Group 1'), []).append(t['id'])
+
+        self.match_positions = {m['id']: i for i, m in enumerate(matches)}
+
+        # (group, round) -> match positions, sorted by match_num
+        self.match_slots = {}
+        for i, m in enumerate(matches):
+            self.match_slots.setdefault((m.get('group', 'Group 1'), m['round']), []).append(i)
+        for positions in self.match_slots.values():
+            positions.sort(key=lambda i: matches[i]['match_num'])
+
+        self.groups = sorted({g for g, _ in self.match_slots})
+        self.rounds_by_group = {g: sorted(r for grp, r in self.match_slots if grp == g) for g in self.groups}
+
+        self.players_by_id = {p['id']: p for p in players}
@@ -0,0 +1,287 @@
+"""
+Columnar snapshot of the finished match history, for analysis over arrays
+instead of per-match dicts.
+
+Written next to the database (data/snapshot/<stamp>/) as plain .npy files
+and opened memory-mapped, so every process shares the same pages and
+nothing is decoded on open:
+
+    per match       jornada, score_a, score_b, complete, team_a, team_b, size_a, size_b
+    per appearance  match (row in the match columns), player, side (0 = A, 1 = B)
+
+Players and teams are integer-coded; ids.json maps codes back to ids.
+manifest.json records the DB generation the snapshot was built at and the
+history stamp (see DatabaseManager.history_stamp), which only changes when
+finished matches do, so live score edits do not make it stale.
+
+Everything here needs NumPy; without it `load` returns None and callers
+fall back to the row-based paths.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError: # Windows: threads in this process are still serialized
+    fcntl = None
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FORMAT = 1
+MATCH_COLUMNS = ('jornada', 'score_a', 'score_b', 'complete', 'team_a', 'team_b', 'size_a', 'size_b')
+APPEARANCE_COLUMNS = ('match', 'player', 'side')
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+def snapshot_dir(db) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db.db_path)), "snapshot")
+
+@contextmanager
+def _locked(directory: str):
+    """Serialize builds and loads of one snapshot directory across threads and processes."""
+    os.makedirs(directory, exist_ok=True)
+    with _locks_guard:
+        lock = _locks.setdefault(directory, threading.Lock())
+    with lock, open(os.path.join(directory, LOCK), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def _read_manifest(directory: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _is_current(manifest: Optional[Dict], stamp: int) -> bool:
+    return bool(manifest) and manifest.get('format') == FORMAT and manifest.get('history_stamp') == stamp
+
+class HistorySnapshot:
+    """Read-only, memory-mapped columns of one version of the match history."""
+    def __init__(self, path: str, manifest: Dict):
+        import numpy as np
+        self.path = path
+        self.stamp = manifest['history_stamp']
+        self.generation = manifest['generation']
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                        for name in MATCH_COLUMNS + APPEARANCE_COLUMNS}
+        with open(os.path.join(path, "ids.json")) as f:
+            ids = json.load(f)
+        self.player_ids: List[str] = ids['players']
+        self.team_ids: List[str] = ids['teams']
+        self.player_codes = {pid: i for i, pid in enumerate(self.player_ids)}
+
+    def __len__(self) -> int:
+        return len(self.columns['jornada'])
+
+    @property
+    def last_jornada(self) -> int:
+        jornada = self.columns['jornada']
+        return int(jornada.max()) if len(jornada) else 0
+
+    def _appearance_results(self):
+        """(complete, goals for, goals against) per appearance."""
+        import numpy as np
+        c = self.columns
+        match, side = c['match'], c['side']
+        score_a, score_b = c['score_a'][match], c['score_b'][match]
+        goals_for = np.where(side == 0, score_a, score_b)
+        goals_against = np.where(side == 0, score_b, score_a)
+        return c['complete'][match], goals_for, goals_against
+
+    def player_stats(self, player_ids: List[str]) -> Dict[str, "np.ndarray"]:
+        """Same result as standings.aggregate_arrays over the whole history, from the columns."""
+        import numpy as np
+        # Snapshot player code -> position in player_ids (-1: not asked for)
+        position = np.full(len(self.player_ids) + 1, -1, dtype=np.int64)
+        for i, pid in enumerate(player_ids):
+            code = self.player_codes.get(pid)
+            if code is not None:
+                position[code] = i
+        complete, goals_for, goals_against = self._appearance_results()
+        code = position[self.columns['player']]
+        keep = complete & (code >= 0)
+        code = code[keep]
+        gd = (goals_for - goals_against)[keep].astype(np.int64)
+        win = gd > 0
+        draw = gd == 0
+
+        n = len(player_ids)
+        def total(weights=None):
+            return np.bincount(code, weights=weights, minlength=n).astype(np.int64)
+        return {
+            'Pts': total(3 * win + draw),
+            'GP': total(),
+            'W': total(win),
+            'D': total(draw),
+            'L': total(gd < 0),
+            'GD': total(gd),
+        }
+
+    def head_to_head(self, player_a: str, player_b: str) -> Dict[str, Dict[str, int]]:
+        """
+        `player_a`'s record against `player_b` and alongside them, over
+        finished matches: {'against': {...}, 'together': {...}} with games,
+        wins, draws, losses and goal difference.
+        """
+        import numpy as np
+        c = self.columns
+        side_of = {}
+        for key, pid in (('a', player_a), ('b', player_b)):
+            sides = np.full(len(self), -1, dtype=np.int8)
+            code = self.player_codes.get(pid)
+            if code is not None:
+                mine = c['player'] == code
+                sides[c['match'][mine]] = c['side'][mine]
+            side_of[key] = sides
+
+        both = c['complete'] & (side_of['a'] >= 0) & (side_of['b'] >= 0)
+        gd = np.where(side_of['a'] == 0, 1, -1) * (c['score_a'].astype(np.int64) - c['score_b'])
+        record = {}
+        for label, mask in (('against', both & (side_of['a'] != side_of['b'])),
+                            ('together', both & (side_of['a'] == side_of['b']))):
+            diff = gd[mask]
+            record[label] = {
+                'games': int(mask.sum()),
+                'wins': int((diff > 0).sum()),
+                'draws': int((diff == 0).sum()),
+                'losses': int((diff < 0).sum()),
+                'gd': int(diff.sum()),
+            }
+        return record
+
+    def replay_ratings(self, params: Dict) -> Dict[str, Dict]:
+        """
+        Full Elo replay (see ratings.apply_matches) over matches of finished
+        jornadas, in play order. Same arithmetic in the same order, so the
+        result matches the row-based replay exactly.
+        """
+        from utils.ratings import expected_score
+        base, k, scale = params['base'], params['k'], params['scale']
+        c = self.columns
+        # One bulk conversion per column; per-element NumPy access would be slower than the Elo math
+        jornada, complete = c['jornada'].tolist(), c['complete'].tolist()
+        score_a, score_b = c['score_a'].tolist(), c['score_b'].tolist()
+        size_a, size_b = c['size_a'].tolist(), c['size_b'].tolist()
+        players = c['player'].tolist()
+
+        ratings = {}
+        games = {}
+        start = 0
+        for i in range(len(jornada)):
+            end_a = start + size_a[i]
+            end = end_a + size_b[i]
+            team_a, team_b = players[start:end_a], players[end_a:end]
+            start = end
+            if jornada[i] <= 0 or not complete[i] or not team_a or not team_b:
+                continue
+            rating_a = sum(ratings.get(p, base) for p in team_a) / len(team_a)
+            rating_b = sum(ratings.get(p, base) for p in team_b) / len(team_b)
+            actual = 1.0 if score_a[i] > score_b[i] else 0.0 if score_a[i] < score_b[i] else 0.5
+            delta = k * (actual - expected_score(rating_a, rating_b, scale))
+            for team, change in ((team_a, delta), (team_b, -delta)):
+                for p in team:
+                    ratings[p] = ratings.get(p, base) + change
+                    games[p] = games.get(p, 0) + 1
+        return {self.player_ids[p]: {'rating': r, 'games': games[p]} for p, r in ratings.items()}
+
+def build(db, directory: Optional[str] = None) -> str:
+    """
+    Write a snapshot of the current history and make it the current one
+    (nothing to do if another build already did). Rows are streamed into
+    compact typed buffers, never per-match dicts. Returns the snapshot's
+    directory.
+    """
+    directory = directory or snapshot_dir(db)
+    with _locked(directory):
+        return _build(db, directory)
+
+def _build(db, directory: str) -> str:
+    import numpy as np
+    # Read the stamps before the data: a concurrent write can only make the snapshot look stale
+    stamp, generation = db.history_stamp(), db.generation()
+    target = os.path.join(directory, str(stamp))
+    if _is_current(_read_manifest(directory), stamp) and os.path.isdir(target):
+        # Another thread or process built this version while we waited for the lock
+        return target
+
+    cols = {name: array('q') for name in MATCH_COLUMNS + APPEARANCE_COLUMNS}
+    player_codes, team_codes = {}, {}
+    def team_code(team_id):
+        return -1 if team_id is None else team_codes.setdefault(team_id, len(team_codes))
+
+    last_id = None
+    for match_id, jornada, score_a, score_b, complete, team_a, team_b, side, player_id in db.iter_appearances():
+        if match_id != last_id:
+            last_id = match_id
+            row = len(cols['jornada'])
+            for name, value in (('jornada', jornada or 0), ('score_a', score_a or 0), ('score_b', score_b or 0),
+                                ('complete', complete), ('team_a', team_code(team_a)), ('team_b', team_code(team_b)),
+                                ('size_a', 0), ('size_b', 0)):
+                cols[name].append(value)
+        if player_id is None:
+            continue
+        side_code = 0 if side == 'A' else 1
+        cols['size_a' if side_code == 0 else 'size_b'][row] += 1
+        cols['match'].append(row)
+        cols['player'].append(player_codes.setdefault(player_id, len(player_codes)))
+        cols['side'].append(side_code)
+
+    dtypes = {'complete': np.bool_, 'side': np.int8, 'size_a': np.int16, 'size_b': np.int16}
+    scratch = tempfile.mkdtemp(dir=directory, prefix=".build-")
+    try:
+        for name, values in cols.items():
+            np.save(os.path.join(scratch, f"{name}.npy"),
+                    np.frombuffer(values, dtype=np.int64).astype(dtypes.get(name, np.int32)))
+        with open(os.path.join(scratch, "ids.json"), "w") as f:
+            json.dump({'players': list(player_codes), 'teams': list(team_codes)}, f)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(scratch, target)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+    manifest = {'format': FORMAT, 'history_stamp': stamp, 'generation': generation,
+                'matches': len(cols['jornada']), 'appearances': len(cols['match'])}
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+    # Older versions (files still mapped elsewhere stay readable until unmapped)
+    for name in os.listdir(directory):
+        if name != str(stamp) and not name.startswith('.') and name != MANIFEST:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return target
+
+def load(db, current: Optional[HistorySnapshot] = None) -> Optional[HistorySnapshot]:
+    """
+    The snapshot for the current history: `current` when still valid, else
+    the one on disk, rebuilt first if stale or missing. None without NumPy.
+    """
+    try:
+        import numpy # noqa: F401
+    except ImportError:
+        return None
+    stamp = db.history_stamp()
+    if current is not None and current.stamp == stamp:
+        return current
+    directory = snapshot_dir(db)
+    # Under the lock, so a concurrent build cannot remove the files between reading the manifest and mapping them
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        if not _is_current(manifest, stamp):
+            _build(db, directory)
+            manifest = _read_manifest(directory)
+        return HistorySnapshot(os.path.join(directory, str(manifest['history_stamp'])), manifest)
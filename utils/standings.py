@@ -0,0 +1,119 @@
+from typing import List, Dict, Iterable, Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Per-player aggregate columns, in leaderboard order
+STAT_KEYS = ('Pts', 'GP', 'W', 'D', 'L', 'GD')
+
+def empty_stats() -> Dict[str, int]:
+    return {k: 0 for k in STAT_KEYS}
+
+def match_deltas(match: Dict) -> List[Tuple[str, Dict[str, int]]]:
+    """
+    Returns (player_id, stat increments) for every player in a completed match.
+    Incomplete matches contribute nothing.
+    """
+    if not match.get('is_complete', False):
+        return []
+
+    score_a = int(match['score_a'])
+    score_b = int(match['score_b'])
+
+    # Determine result
+    if score_a > score_b:
+        res_a, res_b = 'W', 'L'
+        pts_a, pts_b = 3, 0
+    elif score_a < score_b:
+        res_a, res_b = 'L', 'W'
+        pts_a, pts_b = 0, 3
+    else:
+        res_a, res_b = 'D', 'D'
+        pts_a, pts_b = 1, 1
+
+    deltas = []
+    for pids, res, pts, gd in ((match['team_a_players'], res_a, pts_a, score_a - score_b),
+                               (match['team_b_players'], res_b, pts_b, score_b - score_a)):
+        for pid in pids:
+            delta = empty_stats()
+            delta['GP'] = 1
+            delta['Pts'] = pts
+            delta['GD'] = gd
+            delta[res] = 1
+            deltas.append((pid, delta))
+    return deltas
+
+def accumulate(stats: Dict[str, Dict[str, int]], matches: Iterable[Dict], only_known: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Adds the results of `matches` into `stats` (keyed by player id) in place.
+    With only_known=True, players missing from `stats` are skipped.
+    """
+    for m in matches:
+        for pid, delta in match_deltas(m):
+            if pid not in stats:
+                if only_known:
+                    continue
+                stats[pid] = empty_stats()
+            row = stats[pid]
+            for k in STAT_KEYS:
+                row[k] += delta[k]
+    return stats
+
+def subtract(after: Dict[str, Dict[str, int]], before: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    """Stats accrued between two cumulative snapshots (players with no games in between are dropped)."""
+    window = {}
+    for pid, row in after.items():
+        base = before.get(pid)
+        delta = {k: row[k] - (base[k] if base else 0) for k in STAT_KEYS}
+        if delta['GP']:
+            window[pid] = delta
+    return window
+
+def aggregate_arrays(player_ids: List[str], matches: Iterable[Dict]) -> Optional[Dict[str, "np.ndarray"]]:
+    """
+    Vectorized equivalent of accumulate() for a fixed list of player ids.
+    Matches are flattened into one (player code, goals for, goals against)
+    row per player appearance and summed with np.bincount. Returns one int64
+    array per stat, aligned with `player_ids`, or None without NumPy.
+    """
+    try:
+        import numpy as np # Deferred: only the full recompute needs it
+    except ImportError: # Pure-Python fallback via accumulate()
+        return None
+
+    codes = {pid: i for i, pid in enumerate(player_ids)}
+    complete = [m for m in matches if m.get('is_complete', False)]
+    n_matches = len(complete)
+
+    score_a = np.fromiter((int(m['score_a']) for m in complete), dtype=np.int64, count=n_matches)
+    score_b = np.fromiter((int(m['score_b']) for m in complete), dtype=np.int64, count=n_matches)
+    size_a = np.fromiter((len(m['team_a_players']) for m in complete), dtype=np.int64, count=n_matches)
+    size_b = np.fromiter((len(m['team_b_players']) for m in complete), dtype=np.int64, count=n_matches)
+
+    # Side A appearances first, then side B; unknown players get code -1
+    code = np.fromiter(
+        (codes.get(pid, -1) for key in ('team_a_players', 'team_b_players') for m in complete for pid in m[key]),
+        dtype=np.int64,
+        count=int(size_a.sum() + size_b.sum()),
+    )
+    goals_for = np.concatenate([np.repeat(score_a, size_a), np.repeat(score_b, size_b)])
+    goals_against = np.concatenate([np.repeat(score_b, size_a), np.repeat(score_a, size_b)])
+
+    known = code >= 0
+    code = code[known]
+    gd = (goals_for - goals_against)[known]
+    win = gd > 0
+    draw = gd == 0
+
+    n = len(player_ids)
+    def total(weights=None):
+        return np.bincount(code, weights=weights, minlength=n).astype(np.int64)
+
+    return {
+        'Pts': total(3 * win + draw),
+        'GP': total(),
+        'W': total(win),
+        'D': total(draw),
+        'L': total(gd < 0),
+        'GD': total(gd),
+    }
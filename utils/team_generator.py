@@ -0,0 +1,142 @@
+import random
+import time
+from typing import List, Dict, Iterable, Optional, Sequence
+
+GROUPS = ('Group 1', 'Group 2')
+TEAM_SIZE = 3
+
+# Partner teams tried per team in each local-search pass (the most opposite ones by strength)
+SWAP_CANDIDATES = 8
+
+def _teammate_map(pairs: Iterable[Sequence[str]]) -> Dict[str, set]:
+    teammates = {}
+    for a, b in pairs:
+        teammates.setdefault(a, set()).add(b)
+        teammates.setdefault(b, set()).add(a)
+    return teammates
+
+def _repeats(members: List[str], teammates: Dict[str, set]) -> int:
+    return sum(1 for i, a in enumerate(members) for b in members[i + 1:] if b in teammates.get(a, ()))
+
+def _deal(players: List[str], strength: Dict[str, float], num_teams: int, team_size: int,
+          teammates: Dict[str, set]) -> List[List[str]]:
+    """
+    Deal players in rounds of `num_teams`, strongest round first. Within a
+    round the heaviest team so far gets the weakest player of the round whose
+    previous teammates are not already on it.
+    """
+    teams = [[] for _ in range(num_teams)]
+    sums = [0.0] * num_teams
+    ranked = sorted(players, key=lambda p: -strength[p])
+    for start in range(0, num_teams * team_size, num_teams):
+        remaining = ranked[start:start + num_teams][::-1] # weakest first
+        for i in sorted(range(num_teams), key=lambda i: -sums[i]):
+            pick = next((p for p in remaining if not teammates.get(p, set()) & set(teams[i])), remaining[0])
+            remaining.remove(pick)
+            teams[i].append(pick)
+            sums[i] += strength[pick]
+    return teams
+
+def _local_search(teams: List[List[str]], strength: Dict[str, float], teammates: Dict[str, set],
+                  repeat_weight: float, deadline: float):
+    """
+    Pairwise player swaps between teams, improving
+    sum((team strength - mean)^2) + repeat_weight * repeated teammate pairs.
+    Teams with repeats try every other team; the rest only try the teams
+    furthest from the mean on the other side. Stops at a local optimum or
+    the deadline.
+    """
+    sums = [sum(strength[p] for p in t) for t in teams]
+    mean = sum(sums) / len(teams)
+    none = frozenset()
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        order = sorted(range(len(teams)), key=lambda i: -abs(sums[i] - mean))
+        by_sum = sorted(range(len(teams)), key=lambda i: sums[i])
+        lightest, heaviest = by_sum[:SWAP_CANDIDATES + 1], by_sum[::-1][:SWAP_CANDIDATES + 1]
+        for i in order:
+            has_repeats = bool(teammates) and _repeats(teams[i], teammates) > 0
+            if has_repeats:
+                partners = [j for j in range(len(teams)) if j != i]
+            else:
+                # Heavier-than-average teams swap with the lightest, and vice versa
+                partners = [j for j in (lightest if sums[i] > mean else heaviest) if j != i]
+
+            best = None
+            for j in partners:
+                gap = sums[i] - sums[j]
+                for a in teams[i]:
+                    previous_a = teammates.get(a, none)
+                    for b in teams[j]:
+                        d = strength[b] - strength[a]
+                        delta = 2 * d * gap + 2 * d * d
+                        if not has_repeats and delta >= (best[0] if best else 0):
+                            continue # team i has no repeats to remove, so this cannot win
+                        if teammates:
+                            # Repeated pairs gained minus lost, on both sides of the swap
+                            previous_b = teammates.get(b, none)
+                            repeats = 0
+                            for x in teams[i]:
+                                if x != a:
+                                    repeats += (x in previous_b) - (x in previous_a)
+                            for x in teams[j]:
+                                if x != b:
+                                    repeats += (x in previous_a) - (x in previous_b)
+                            delta += repeat_weight * repeats
+                        if delta < -1e-9 and (best is None or delta < best[0]):
+                            best = (delta, j, a, b)
+            if best:
+                _, j, a, b = best
+                teams[i][teams[i].index(a)] = b
+                teams[j][teams[j].index(b)] = a
+                d = strength[b] - strength[a]
+                sums[i] += d
+                sums[j] -= d
+                improved = True
+
+def generate_teams(pool: List[str], strength: Dict[str, float], num_teams: int, team_size: int = TEAM_SIZE,
+                   groups: Sequence[str] = GROUPS, previous_teammates: Iterable[Sequence[str]] = (),
+                   seed: Optional[int] = None, time_limit: float = 0.5) -> Dict:
+    """
+    Split `pool` (player ids) into up to `num_teams` teams of `team_size`,
+    minimizing the spread of team strength (sum of member strengths) while
+    avoiding pairs in `previous_teammates`. Teams are then dealt into
+    `groups` so each group gets a similar mix. Players that do not fit are
+    benched at random.
+
+    Returns {'teams': [{'players', 'group', 'strength'}], 'bench', 'spread',
+    'repeats'}, strongest team first.
+    """
+    rng = random.Random(seed)
+    players = list(dict.fromkeys(pool))
+    num_teams = min(num_teams, len(players) // team_size)
+    rng.shuffle(players) # random bench, and random tie-breaks among equal strengths
+    playing, bench = players[:num_teams * team_size], players[num_teams * team_size:]
+    if num_teams == 0:
+        return {'teams': [], 'bench': bench, 'spread': 0.0, 'repeats': 0}
+
+    strength = {p: float(strength.get(p, 0.0)) for p in playing}
+    teammates = _teammate_map(previous_teammates)
+    teams = _deal(playing, strength, num_teams, team_size, teammates)
+
+    # One avoidable repeat always outweighs any single balance improvement
+    values = list(strength.values())
+    repeat_weight = ((max(values) - min(values)) * team_size) ** 2 * 4 + 1
+    _local_search(teams, strength, teammates, repeat_weight, time.perf_counter() + time_limit)
+
+    sums = [sum(strength[p] for p in t) for t in teams]
+    ranked = sorted(range(num_teams), key=lambda i: -sums[i])
+    result = []
+    for rank, i in enumerate(ranked):
+        # Snake order (1, 2, 2, 1, ...) keeps the groups' strengths close
+        group = groups[rank % len(groups)] if (rank // len(groups)) % 2 == 0 else groups[-1 - rank % len(groups)]
+        result.append({'players': sorted(teams[i], key=lambda p: -strength[p]), 'group': group, 'strength': sums[i]})
+
+    return {
+        'teams': result,
+        'bench': bench,
+        'spread': max(sums) - min(sums),
+        'repeats': sum(_repeats(t, teammates) for t in teams),
+    }
@@ -0,0 +1,93 @@
+import streamlit as st
+from utils import instrumentation
+
+DIAGNOSTICS_KEY = 'diagnostics_enabled'
+STATS_KEY = 'diagnostics_stats'
+# Read once per cached load by design (see data_manager._cached); not worth flagging
+REPEAT_EXEMPT = ('db.generation',)
+
+def record_trace(trace):
+    """Trace sink: keep this browser session's previous rerun and running totals (when enabled)."""
+    if not st.session_state.get(DIAGNOSTICS_KEY):
+        return
+    stats = st.session_state.get(STATS_KEY)
+    if stats is None:
+        stats = st.session_state[STATS_KEY] = {
+            'session': instrumentation.Stats(), 'rerun': None, 'reruns': 0, 'fragments': 0,
+        }
+    stats['session'].merge(trace)
+    if trace.label == 'rerun':
+        stats['rerun'] = trace
+        stats['reruns'] += 1
+    else:
+        stats['fragments'] += 1
+
+def _table(stats: instrumentation.Stats):
+    st.dataframe(
+        [dict(row, ms=row['seconds'] * 1000) for row in stats.rows()],
+        use_container_width=True,
+        hide_index=True,
+        column_order=['name', 'calls', 'ms', 'queries', 'rows', 'json_bytes', 'checkouts', 'opened'],
+        column_config={
+            "name": st.column_config.TextColumn("Name"),
+            "calls": st.column_config.NumberColumn("Calls"),
+            "ms": st.column_config.NumberColumn("Time (ms)", format="%.2f", help="Inclusive of nested calls"),
+            "queries": st.column_config.NumberColumn("Queries"),
+            "rows": st.column_config.NumberColumn("Rows"),
+            "json_bytes": st.column_config.NumberColumn("JSON bytes"),
+            "checkouts": st.column_config.NumberColumn("Checkouts", help="Pooled DB connections checked out"),
+            "opened": st.column_config.NumberColumn("Opened", help="DB connections opened; 0 once the pool is warm"),
+        }
+    )
+
+@instrumentation.instrumented(root=True)
+def render_diagnostics():
+    st.header("🩺 Diagnostics")
+    stats = st.session_state.get(STATS_KEY)
+    process = instrumentation.process_totals()
+    if not stats or stats['rerun'] is None:
+        st.info("Measuring from this rerun on; interact with the app to see the results.")
+    else:
+        rerun = stats['rerun']
+        c_time, c_queries, c_rows, c_json, c_conn = st.columns(5)
+        c_time.metric("Previous rerun", f"{rerun.seconds * 1000:.0f} ms")
+        c_queries.metric("Queries", int(rerun.total('queries')))
+        c_rows.metric("Rows", int(rerun.total('rows')))
+        c_json.metric("JSON decoded", f"{rerun.total('json_bytes') / 1024:.1f} KB")
+        c_conn.metric("DB connections opened", int(rerun.total('opened')),
+                      help=f"{int(rerun.total('checkouts'))} checkouts from the pool; 0 opened once the pool is warm")
+
+        repeated = [f"{name} ×{row['calls']}" for name, row in sorted(rerun.data.items())
+                    if name.startswith('db.') and row['calls'] > 1 and name not in REPEAT_EXEMPT]
+        if repeated:
+            st.warning("Called more than once in the previous rerun: " + ", ".join(repeated))
+
+        st.subheader("Previous rerun")
+        _table(rerun)
+        st.subheader(f"This session ({stats['reruns']} reruns, {stats['fragments']} fragment reruns)")
+        _table(stats['session'])
+        if st.button("Reset session totals", key="diagnostics_reset"):
+            del st.session_state[STATS_KEY]
+            st.rerun()
+
+    st.subheader("This server process (all sessions)")
+    _table(process)
+
+    c_json, c_prom = st.columns(2)
+    with c_json:
+        st.download_button(
+            "Export JSON",
+            data=instrumentation.to_json(
+                rerun=stats and stats['rerun'], session=stats and stats['session'], process=process
+            ),
+            file_name="diagnostics.json",
+            mime="application/json",
+        )
+    with c_prom:
+        st.download_button(
+            "Export Prometheus",
+            data=instrumentation.to_prometheus(process),
+            file_name="diagnostics.prom",
+            mime="text/plain",
+            help="Process totals in the Prometheus text format",
+        )
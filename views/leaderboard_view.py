@@ -1,25 +1,46 @@
 import streamlit as st
-from utils import data_manager
+from utils import data_manager, instrumentation
 
+HISTORY_PAGE_SIZE = 20
+
+@instrumentation.instrumented(root=True)
 def render_leaderboard():
     st.header("🏆 Global Leaderboard")
     
     players = data_manager.load_players()
-    history = data_manager.load_matches_history()
-    
-    # Also include current session matches for "Live" updates?
-    # User asked for "Auto-update leaderboard from match results"
-    # Usually live updates are better.
-    session = data_manager.load_current_session()
-    current_matches = session['matches'] if session else []
-    
-    all_matches = history + current_matches
     
     if not players:
         st.info("No players found.")
         return
         
-    df = data_manager.calculate_leaderboard(players, all_matches)
+    jornadas = data_manager.load_jornadas()
+    c_window, c_jornada = st.columns(2)
+    with c_window:
+        window = st.selectbox("Standings", data_manager.STANDINGS_WINDOWS, key="standings_window")
+    jornada_id = None
+    if window == data_manager.WINDOW_AS_OF:
+        with c_jornada:
+            jornada_id = st.selectbox("Jornada", [j['id'] for j in jornadas], format_func=jornada_labels(jornadas).get,
+                                      key="standings_jornada")
+    
+    render_standings(window, jornada_id)
+    
+    render_head_to_head()
+    
+    render_match_history(players)
+
+@st.fragment(run_every=data_manager.LIVE_REFRESH_SECONDS)
+@instrumentation.instrumented(root=True)
+def render_standings(window, jornada_id):
+    """
+    Standings table. Re-runs on its own timer so open browsers pick up new
+    scores without a full rerun. While nothing was written the leaderboard
+    comes from the cache (one generation read), but the table is still
+    serialized and sent again: a fragment re-run drops any element it does
+    not draw, so the draw cannot be skipped.
+    """
+    # Live matches are layered on top for the all-time window; ratings (finished jornadas only) on every window
+    df = data_manager.load_leaderboard(window, jornada_id)
     
     st.dataframe(
         df, 
@@ -32,8 +53,113 @@ def render_leaderboard():
             "D": st.column_config.NumberColumn("Draws"),
             "L": st.column_config.NumberColumn("Losses"),
             "GD": st.column_config.NumberColumn("Goal Diff"),
+            "Rating": st.column_config.NumberColumn("Rating", format="%.0f", help="Elo skill rating"),
         }
     )
-    
-    with st.expander("Raw Match History"):
-        st.json(all_matches)
+
+def jornada_labels(jornadas):
+    return {j['id']: f"Jornada {j['number']} ({j['played_on']})" for j in jornadas}
+
+@instrumentation.instrumented(root=True)
+def render_head_to_head():
+    """Two players' finished-match record against each other and as teammates."""
+    with st.expander("🤝 Head-to-head"):
+        player_index = data_manager.load_player_index()
+        ids = player_index.ordered_ids
+        c_a, c_b = st.columns(2)
+        with c_a:
+            player_a = st.selectbox("Player", ids, index=None, format_func=player_index.label,
+                                    placeholder="Choose a player", key="h2h_a")
+        with c_b:
+            player_b = st.selectbox("Versus", ids, index=None, format_func=player_index.label,
+                                    placeholder="Choose a player", key="h2h_b")
+        if player_a is None or player_b is None or player_a == player_b:
+            st.caption("Pick two different players.")
+            return
+        
+        record = data_manager.head_to_head(player_a, player_b)
+        name_a, name_b = player_index.label(player_a), player_index.label(player_b)
+        st.dataframe(
+            [
+                {'': f"{name_a} vs {name_b}", **record['against']},
+                {'': f"{name_a} with {name_b}", **record['together']},
+            ],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "games": st.column_config.NumberColumn("Games"),
+                "wins": st.column_config.NumberColumn("Wins"),
+                "draws": st.column_config.NumberColumn("Draws"),
+                "losses": st.column_config.NumberColumn("Losses"),
+                "gd": st.column_config.NumberColumn("Goal Diff"),
+            }
+        )
+
+@instrumentation.instrumented(root=True)
+def render_match_history(players):
+    """Finished matches, one bounded page at a time."""
+    with st.expander("Match History"):
+        filters = data_manager.load_history_filters()
+        names = {p['id']: p['name'] for p in players}
+        
+        c_player, c_team, c_group, c_jornada = st.columns(4)
+        with c_player:
+            player_id = st.selectbox("Player", list(names), index=None, format_func=lambda x: names.get(x, "Unknown"),
+                                     placeholder="All players", key="hist_player")
+        with c_team:
+            team = st.selectbox("Team", filters['teams'], index=None, placeholder="All teams", key="hist_team")
+        with c_group:
+            group = st.selectbox("Group", filters['groups'], index=None, placeholder="All groups", key="hist_group")
+        with c_jornada:
+            labels = jornada_labels(filters['jornadas'])
+            jornada = st.selectbox("Jornada", list(labels), index=None, format_func=labels.get,
+                                   placeholder="All jornadas", key="hist_jornada")
+        
+        # Stack of page cursors; reset whenever the filters change
+        filter_key = (player_id, team, group, jornada)
+        if st.session_state.get('hist_filter') != filter_key:
+            st.session_state['hist_filter'] = filter_key
+            st.session_state['hist_cursors'] = [None]
+        cursors = st.session_state['hist_cursors']
+        
+        matches, next_cursor = data_manager.load_matches_page(
+            HISTORY_PAGE_SIZE, cursors[-1], player_id=player_id, team=team, group=group, jornada=jornada
+        )
+        if not matches:
+            st.caption("No matches found.")
+            return
+        
+        def player_names(ids):
+            return ", ".join(names.get(pid, "Unknown") for pid in ids)
+        
+        labels = jornada_labels(filters['jornadas'])
+        st.dataframe(
+            [
+                {
+                    'Jornada': labels.get(m['jornada_id'], "-"),
+                    'Group': m['group'],
+                    'Round': m['round'],
+                    'Match': m['match_num'],
+                    'Team A': m['team_a_name'] or "-",
+                    'Players A': player_names(m['team_a_players']),
+                    'Score': f"{m['score_a']} - {m['score_b']}",
+                    'Team B': m['team_b_name'] or "-",
+                    'Players B': player_names(m['team_b_players']),
+                }
+                for m in matches
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+        
+        c_newer, c_page, c_older = st.columns([1, 2, 1])
+        with c_newer:
+            if st.button("◀ Newer", disabled=len(cursors) == 1, key="hist_newer"):
+                cursors.pop()
+                st.rerun()
+        with c_page:
+            st.caption(f"Page {len(cursors)}")
+        with c_older:
+            if st.button("Older ▶", disabled=next_cursor is None, key="hist_older"):
+                cursors.append(next_cursor)
+                st.rerun()
@@ -1,122 +1,147 @@
 import streamlit as st
-from utils import data_manager
+from utils import data_manager, instrumentation
 
+# Outcome of each card's last save, shown inside that card: match id -> result
+SAVE_RESULT_KEY = 'match_save_results'
+
+def _sync_widgets(match):
+    """Drop stale widget state so the card shows the stored match (e.g. another scorekeeper's save)."""
+    stored = {
+        f"ta_{match['id']}": match['team_a_id'],
+        f"tb_{match['id']}": match['team_b_id'],
+        f"sa_{match['id']}": match['score_a'],
+        f"sb_{match['id']}": match['score_b'],
+    }
+    for key, value in stored.items():
+        if key in st.session_state and st.session_state[key] != value:
+            del st.session_state[key]
+
+def _save_card(base):
+    """Widget callback: save this card's values, edited from `base` (the match as rendered)."""
+    match_id = base['id']
+    ta = st.session_state.get(f"ta_{match_id}")
+    tb = st.session_state.get(f"tb_{match_id}")
+    match = dict(base, team_a_id=ta, team_b_id=tb,
+                 score_a=st.session_state.get(f"sa_{match_id}", base['score_a']),
+                 score_b=st.session_state.get(f"sb_{match_id}", base['score_b']))
+    
+    if ta and tb and ta != tb:
+        match['is_complete'] = True
+        index = data_manager.load_session_index()
+        if index is None:
+            # The session was cleared since this card rendered: report the match as gone, like the save would
+            st.session_state.setdefault(SAVE_RESULT_KEY, {})[match_id] = {'matches': 0, 'merged': 0, 'conflicts': [match_id]}
+            return
+        t_a_obj = index.teams_by_id.get(ta)
+        t_b_obj = index.teams_by_id.get(tb)
+        if t_a_obj: match['team_a_players'] = list(t_a_obj['players'])
+        if t_b_obj: match['team_b_players'] = list(t_b_obj['players'])
+    else:
+        match['is_complete'] = False
+    st.session_state.setdefault(SAVE_RESULT_KEY, {})[match_id] = data_manager.save_session_match(match, base)
+
+@instrumentation.instrumented(root=True)
 def render_matches():
     st.header("⚽ Matches")
     
-    session = data_manager.load_current_session()
+    session = data_manager.load_current_session(mutable=False)
     if not session:
         st.info("No active session. Go to Setup to start.")
         return
 
-    teams = session['teams']
-    matches = session['matches']
-    
-    # Team Options for Dropdown: Format "Name (Group)"
-    # Filter teams that have players? No, allow all.
-    team_options = {t['id']: f"{t['name']} ({t['group']})" for t in teams}
-    team_ids = list(team_options.keys())
-    
-    # Organize by Group
-    match_groups = sorted(list(set(m.get('group', 'Group 1') for m in matches)))
+    st.caption("Scores are saved as you enter them.")
+    render_match_cards()
+
+    st.divider()
+    if st.button("🏁 Finish Jornada", type="secondary", use_container_width=True):
+        session = data_manager.load_current_session()
+        completed = [m for m in session['matches'] if m.get('is_complete')]
+        data_manager.finish_jornada(completed, session['teams'])
+        data_manager.clear_current_session()
+        st.success("Jornada Finished! Leaderboard Updated.")
+        st.rerun()
+
+@instrumentation.instrumented(root=True)
+def render_match_cards():
+    """Match cards by group and round. Each card refreshes itself (see render_match_card)."""
+    index = data_manager.load_session_index()
+    if index is None:
+        return
     
     # Tabs for Groups
-    tabs = st.tabs(match_groups)
+    tabs = st.tabs(index.groups)
     
-    for idx, group in enumerate(match_groups):
+    for idx, group in enumerate(index.groups):
         with tabs[idx]:
-            # Filter matches for this group
-            group_matches = [m for m in matches if m.get('group', 'Group 1') == group]
-            
             # Organize by Round within Group
-            rounds = sorted(list(set(m['round'] for m in group_matches)))
-            
-            for r in rounds:
+            for r in index.rounds_by_group[group]:
                 with st.expander(f"Round {r}", expanded=True):
-                    round_matches = [m for m in group_matches if m['round'] == r]
-                    round_matches.sort(key=lambda x: x['match_num'])
+                    round_matches = [index.source['matches'][i]['id'] for i in index.match_slots[(group, r)]]
                     
                     # Split matches into chunks of 2 for grid layout
                     chunks = [round_matches[i:i+2] for i in range(0, len(round_matches), 2)]
                     
                     for chunk in chunks:
                         cols = st.columns(2)
-                        for i, match in enumerate(chunk):
+                        for i, match_id in enumerate(chunk):
                             with cols[i]:
-                                with st.container(border=True): # Card style
-                                    st.caption(f"Match {match['match_num']}")
-                                    
-                                    # Team A
-                                    # Filter options: Only show teams in this group? 
-                                    # User requirement: "in the match center there are two dropdowns group 1 and group 2".
-                                    # Ideally we should only show teams belonging to this group in the dropdowns.
-                                    group_teams = [t for t in teams if t.get('group', 'Group 1') == group]
-                                    group_team_ids = [t['id'] for t in group_teams]
-                                    # Add current selected if not in group (edge case)? No, strict filtering.
-                                    
-                                    # Fallback if team is not in group (e.g. valid ID but wrong group)? 
-                                    # Let's trust the filter or include the currently selected one to be safe.
-                                    
-                                    current_a = match['team_a_id']
-                                    current_b = match['team_b_id']
-                                    
-                                    # Effective options for this match
-                                    match_team_ids = group_team_ids
-                                    
-                                    ta = st.selectbox("Team A", match_team_ids, 
-                                                    index=match_team_ids.index(current_a) if current_a in match_team_ids else None,
-                                                    format_func=lambda x: team_options.get(x, "Unknown"),
-                                                    key=f"ta_{match['id']}",
-                                                    label_visibility="collapsed",
-                                                    placeholder="Select Home")
-                                    
-                                    # Scores Centered
-                                    c_s1, c_vs, c_s2 = st.columns([1,1,1])
-                                    with c_s1:
-                                        sa = st.number_input("Score A", min_value=0, value=match['score_a'], key=f"sa_{match['id']}", label_visibility="collapsed")
-                                    with c_vs:
-                                        st.markdown("<div style='text-align: center; padding-top: 5px; font-weight: bold;'>VS</div>", unsafe_allow_html=True)
-                                    with c_s2:
-                                        sb = st.number_input("Score B", min_value=0, value=match['score_b'], key=f"sb_{match['id']}", label_visibility="collapsed")
+                                render_match_card(match_id)
 
-                                    # Team B
-                                    tb = st.selectbox("Team B", match_team_ids,
-                                                    index=match_team_ids.index(current_b) if current_b in match_team_ids else None,
-                                                    format_func=lambda x: team_options.get(x, "Unknown"),
-                                                    key=f"tb_{match['id']}",
-                                                    label_visibility="collapsed",
-                                                    placeholder="Select Away")
-
-                                    # Update Logic
-                                    match['team_a_id'] = ta
-                                    match['team_b_id'] = tb
-                                    match['score_a'] = sa
-                                    match['score_b'] = sb
-                                    
-                                    if ta and tb and ta != tb:
-                                        match['is_complete'] = True
-                                        # Use next with default None to avoid crash
-                                        t_a_obj = next((t for t in teams if t['id'] == ta), None)
-                                        t_b_obj = next((t for t in teams if t['id'] == tb), None)
-                                        if t_a_obj: match['team_a_players'] = t_a_obj['players']
-                                        if t_b_obj: match['team_b_players'] = t_b_obj['players']
-                                    else:
-                                        match['is_complete'] = False
-
-    st.divider()
-    # Persistence Buttons
-    c_save, c_finish = st.columns(2)
-    with c_save:
-        if st.button("💾 Save Progress", type="primary", use_container_width=True):
-            data_manager.save_current_session(session)
-            st.toast("Matches Saved Successfully!")
+@st.fragment(run_every=data_manager.LIVE_REFRESH_SECONDS)
+@instrumentation.instrumented(root=True)
+def render_match_card(match_id):
+    """
+    One match. Editing it re-runs and saves only this card; concurrent saves
+    by other scorekeepers are merged (see DatabaseManager.save_session_match).
+    Re-runs on its own timer too, so their saves show up card by card while
+    the rest of the page stays as it is; the session index is rebuilt only
+    when the generation has moved.
+    """
+    index = data_manager.load_session_index()
+    position = index.match_positions.get(match_id) if index else None
+    if position is None:
+        return
+    match = index.source['matches'][position]
+    team_options = index.team_labels
+    # Only show teams belonging to this group in the dropdowns
+    match_team_ids = index.team_ids_by_group.get(match.get('group', 'Group 1'), [])
+    
+    with st.container(border=True): # Card style
+        st.caption(f"Match {match['match_num']}")
         
-    with c_finish:
-        if st.button("🏁 Finish Jornada", type="secondary", use_container_width=True):
-            history = data_manager.load_matches_history()
-            completed = [m for m in matches if m.get('is_complete')]
-            history.extend(completed)
-            data_manager.save_matches_history(history)
-            data_manager.clear_current_session()
-            st.success("Jornada Finished! Leaderboard Updated.")
-            st.rerun()
+        result = st.session_state.get(SAVE_RESULT_KEY, {}).pop(match_id, None)
+        if result and result['conflicts']:
+            st.warning("Another scorekeeper changed this match at the same time. Their version was kept.")
+        elif result and result['merged']:
+            st.caption("Merged with another scorekeeper's edit.")
+        
+        _sync_widgets(match)
+        current_a = match['team_a_id']
+        current_b = match['team_b_id']
+        on_change = dict(on_change=_save_card, args=(dict(match),))
+        
+        st.selectbox("Team A", match_team_ids, 
+                     index=match_team_ids.index(current_a) if current_a in match_team_ids else None,
+                     format_func=lambda x: team_options.get(x, "Unknown"),
+                     key=f"ta_{match_id}",
+                     **on_change,
+                     label_visibility="collapsed",
+                     placeholder="Select Home")
+        
+        # Scores Centered
+        c_s1, c_vs, c_s2 = st.columns([1,1,1])
+        with c_s1:
+            st.number_input("Score A", min_value=0, value=match['score_a'], key=f"sa_{match_id}", label_visibility="collapsed", **on_change)
+        with c_vs:
+            st.markdown("<div style='text-align: center; padding-top: 5px; font-weight: bold;'>VS</div>", unsafe_allow_html=True)
+        with c_s2:
+            st.number_input("Score B", min_value=0, value=match['score_b'], key=f"sb_{match_id}", label_visibility="collapsed", **on_change)
+
+        # Team B
+        st.selectbox("Team B", match_team_ids,
+                     index=match_team_ids.index(current_b) if current_b in match_team_ids else None,
+                     format_func=lambda x: team_options.get(x, "Unknown"),
+                     key=f"tb_{match_id}",
+                     **on_change,
+                     label_visibility="collapsed",
+                     placeholder="Select Away")
@@ -1,7 +1,20 @@
 import streamlit as st
 import uuid
-from utils import data_manager, session_manager
+from utils import data_manager, instrumentation, session_manager
 
+CHECKED_IN_KEY = 'checked_in_sel'
+CHECK_IN_SEARCH_KEY = 'check_in_search'
+TEAM_SEARCH_KEY = 'team_player_search'
+# Players a card's last save left out because another team has them: team id -> names
+TEAM_LEFT_OUT_KEY = 'team_players_left_out'
+
+# Players offered by one picker besides those already selected; search narrows the rest
+MAX_CANDIDATES = 50
+
+def _save_checked_in():
+    data_manager.save_checked_in(st.session_state[CHECKED_IN_KEY])
+
+@instrumentation.instrumented(root=True)
 def render_setup():
     st.header("🛠 Setup & Team Generation")
     
@@ -18,15 +31,16 @@ def render_setup():
             submitted = st.form_submit_button("Add")
             
         if submitted and new_name:
-            players.append({'id': str(uuid.uuid4()), 'name': new_name})
-            data_manager.save_players(players)
+            data_manager.upsert_player({'id': str(uuid.uuid4()), 'name': new_name})
             st.rerun()
 
     if players:
         st.caption(f"Total Players: {len(players)}")
         with st.expander("Show Player List"):
+            # Loaded players are read-only; the editor works on plain copies
+            player_rows = [dict(p) for p in players]
             edited_df = st.data_editor(
-                players,
+                player_rows,
                 hide_index=True,
                 column_config={
                     "id": None, # Hide ID
@@ -37,17 +51,31 @@ def render_setup():
             
             # Check for changes
             # Convert back to list of dicts to compare or just save if different
-            if edited_df != players:
-                 # Update players list
-                 data_manager.save_players(edited_df)
+            if edited_df != player_rows:
+                 # Persist only the rows that changed
+                 data_manager.save_player_changes(player_rows, edited_df)
                  st.rerun()
+
+        # Today's pool for the team generator and the team pickers
+        player_index = data_manager.load_player_index()
+        checked_in = [pid for pid in data_manager.load_checked_in() if pid in player_index.by_id]
+        if st.session_state.get(CHECKED_IN_KEY, checked_in) != checked_in:
+            del st.session_state[CHECKED_IN_KEY] # changed in another session
+        query = st.text_input("Find players to check in", key=CHECK_IN_SEARCH_KEY)
+        candidates = player_index.search(query, MAX_CANDIDATES, exclude=set(checked_in))
+        st.multiselect("Checked-in players", checked_in + candidates,
+                       default=checked_in,
+                       format_func=player_index.label,
+                       key=CHECKED_IN_KEY,
+                       on_change=_save_checked_in)
+        st.caption(f"Checked in: {len(checked_in)}")
             
     st.divider()
     
     # --- Part 2: Session Management ---
     st.subheader("2. Create Teams")
     
-    current_session = data_manager.load_current_session()
+    current_session = data_manager.load_current_session(mutable=False)
     
     col_reset, col_create = st.columns([1, 1])
     
@@ -57,6 +85,7 @@ def render_setup():
             if st.button("Start New Session (12 Empty Teams)", type="primary"):
                 teams = session_manager.create_teams_empty(num_teams=12)
                 matches = session_manager.init_match_slots(rounds=3, matches_per_round=6)
+                session_manager.assign_fixtures(matches, teams)
                 session = {
                     'teams': teams,
                     'matches': matches,
@@ -69,68 +98,22 @@ def render_setup():
             if st.button("⚠ Reset Session (Clear Teams)", type="secondary"):
                 data_manager.clear_current_session()
                 st.rerun()
+        render_team_generator(current_session)
+        render_fixture_scheduler(current_session)
 
     # --- Part 3: Manual Assignment ---
     if current_session:
         st.success("Session Active - Assign Players below")
         
-        teams = current_session['teams']
-        player_options = {p['name']: p['id'] for p in players}
-        player_names_list = list(player_options.keys())
-        
-        updated = False
-        
         # Grid layout for 12 teams
         # 4 columns x 3 rows? Or 3 cols x 4 rows.
+        st.text_input("Find players", key=TEAM_SEARCH_KEY,
+                      help=f"Each team offers up to {MAX_CANDIDATES} unassigned checked-in players; search for others.")
         cols = st.columns(3)
         
-        for i, team in enumerate(teams):
+        for i, team in enumerate(current_session['teams']):
             with cols[i % 3]:
-                with st.container(border=True):
-                    # Header: Name + Group Toggle
-                    c_head, c_grp = st.columns([2, 1])
-                    with c_head:
-                        st.markdown(f"**{team['name']}**")
-                    with c_grp:
-                         current_grp = team.get('group', 'Group 1')
-                         # Simple toggle via radio horizontal
-                         new_grp = st.radio("Grp", ['Group 1', 'Group 2'], 
-                                          index=0 if current_grp == 'Group 1' else 1,
-                                          key=f"grp_{team['id']}",
-                                          label_visibility="collapsed",
-                                          horizontal=True)
-                         if new_grp != current_grp:
-                             team['group'] = new_grp
-                             updated = True
-                    
-                    # Player Multiselect
-                    # Get currently assigned names
-                    current_assigned_ids = team['players']
-                    # Translate to names for default
-                    default_names = []
-                    for pid in current_assigned_ids:
-                        name = next((p['name'] for p in players if p['id'] == pid), None)
-                        if name: default_names.append(name)
-                        
-                    selected_names = st.multiselect("Players", player_names_list, 
-                                                    default=default_names,
-                                                    key=f"team_{team['id']}_sel",
-                                                    label_visibility="collapsed")
-                    
-                    # Update if changed
-                    # Convert names back to IDs
-                    new_ids = [player_options[n] for n in selected_names]
-                    if set(new_ids) != set(current_assigned_ids):
-                         team['players'] = new_ids
-                         team['player_names'] = selected_names
-                         updated = True
-                         
-        if updated:
-            data_manager.save_current_session(current_session)
-            # st.rerun() # Rerun might interpret input flow, sometimes better to let user finish. 
-            # But multiselect sync is tricky. Streamlit executes script top-down. 
-            # If we updated the object in memory, we should save it.
-            # Next rerun will load it.
+                render_team_card(team['id'])
             
     st.divider()
     
@@ -142,26 +125,160 @@ def render_setup():
     
     with col_dl:
         st.write("Current Database")
-        try:
-            db_bytes = data_manager.get_db_binary()
-            st.download_button(
-                label="⬇ Download Database Backup",
-                data=db_bytes,
-                file_name="3vs3_app.db",
-                mime="application/x-sqlite3"
-            )
-        except Exception as e:
-            st.error(f"Error preparing download: {e}")
+        # The backup is only taken when the button is clicked
+        st.download_button(
+            label="⬇ Download Database Backup",
+            data=data_manager.get_db_backup,
+            file_name="3vs3_app.db.gz",
+            mime="application/gzip",
+            on_click="ignore",
+        )
             
     with col_ul:
         st.write("Restore Database")
-        uploaded_file = st.file_uploader("Upload .db file", type=["db", "sqlite", "sqlite3"], label_visibility="collapsed")
+        uploaded_file = st.file_uploader("Upload .db file", type=["db", "sqlite", "sqlite3", "gz"], label_visibility="collapsed")
         if uploaded_file is not None:
              if st.button("⚠ Overwrite & Restore Data", type="primary"):
                  try:
-                     bytes_data = uploaded_file.getvalue()
-                     data_manager.restore_db_from_binary(bytes_data)
+                     data_manager.restore_db_from_file(uploaded_file)
                      st.success("Database restored! Reloading...")
                      st.rerun()
                  except Exception as e:
                      st.error(f"Restore failed: {e}")
+
+GENERATION_RESULT_KEY = 'team_generation_result'
+
+@instrumentation.instrumented(root=True)
+def render_team_generator(current_session):
+    """Fill the session's teams from the checked-in players, balanced by strength."""
+    names_by_id = {p['id']: p['name'] for p in data_manager.load_players()}
+    pool = [pid for pid in data_manager.load_checked_in() if pid in names_by_id]
+    num_teams = min(len(current_session['teams']), len(pool) // 3)
+
+    with st.expander("⚖ Generate Balanced Teams"):
+        basis = st.radio("Balance by", data_manager.BALANCE_OPTIONS, horizontal=True, key="balance_by")
+        st.caption(f"{len(pool)} checked-in players → {num_teams} teams of 3. "
+                   "Last jornada's teammates are kept apart where possible. "
+                   "Replaces the current teams (and fixtures, if scoring has not started).")
+        if st.button("Generate Teams", disabled=num_teams == 0):
+            session = data_manager.load_current_session()
+            result = data_manager.generate_session_teams(session, pool, basis)
+            if not _scoring_started(session):
+                # New teams, new pairings to keep apart
+                data_manager.schedule_session_matches(session)
+            data_manager.save_current_session(session)
+            st.session_state[GENERATION_RESULT_KEY] = {
+                'spread': result['spread'],
+                'repeats': result['repeats'],
+                'bench': [names_by_id[pid] for pid in result['bench']],
+            }
+            st.rerun()
+
+        summary = st.session_state.get(GENERATION_RESULT_KEY)
+        if summary:
+            st.caption(f"Strength spread between teams: {summary['spread']:.1f} · "
+                       f"repeated teammates: {summary['repeats']}")
+            if summary['bench']:
+                st.caption("Sitting out: " + ", ".join(summary['bench']))
+
+def _scoring_started(session) -> bool:
+    return any(m['is_complete'] or m['score_a'] or m['score_b'] for m in session['matches'])
+
+@instrumentation.instrumented(root=True)
+def render_fixture_scheduler(current_session):
+    """Fill every match slot with a round-robin schedule of each group's teams."""
+    with st.expander("📅 Schedule Fixtures"):
+        st.caption("Round-robin within each group: no rematch until every pair has met, "
+                   "Team A/B sides balanced, and pairings whose players met recently avoided. "
+                   "Teams without players are left out. Replaces the current fixtures.")
+        locked = _scoring_started(current_session)
+        if locked:
+            st.caption("Fixtures are locked once scoring has started.")
+        if st.button("Schedule Fixtures", disabled=locked):
+            session = data_manager.load_current_session()
+            data_manager.schedule_session_matches(session)
+            data_manager.save_current_session(session)
+            st.rerun()
+
+def _sync_team_widgets(team):
+    """Drop stale widget state so the card shows the stored team (e.g. after Generate Teams)."""
+    stored = {
+        f"grp_{team['id']}": team.get('group', 'Group 1'),
+        f"team_{team['id']}_sel": list(team['players']),
+    }
+    for key, value in stored.items():
+        if key in st.session_state and st.session_state[key] != value:
+            del st.session_state[key]
+
+def _save_team(team):
+    """
+    Widget callback: save this card's group and players, resolving names by id.
+    Players another team took since this card rendered are left out.
+    """
+    index = data_manager.load_session_index()
+    taken = {pid for tid, t in index.teams_by_id.items() if tid != team['id'] for pid in t['players']} if index else set()
+    selected = st.session_state[f"team_{team['id']}_sel"]
+    player_ids = [pid for pid in selected if pid not in taken]
+    player_index = data_manager.load_player_index()
+    if len(player_ids) < len(selected):
+        st.session_state.setdefault(TEAM_LEFT_OUT_KEY, {})[team['id']] = player_index.names(
+            [pid for pid in selected if pid in taken]
+        )
+    data_manager.save_session_team(dict(
+        team,
+        group=st.session_state[f"grp_{team['id']}"],
+        players=player_ids,
+        player_names=player_index.names(player_ids),
+    ))
+
+def _team_candidates(team, index) -> list:
+    """The team's players, then up to MAX_CANDIDATES unassigned players matching the search."""
+    assigned = {pid for t in index.teams_by_id.values() for pid in t['players']}
+    checked_in = data_manager.load_checked_in()
+    candidates = data_manager.load_player_index().search(
+        st.session_state.get(TEAM_SEARCH_KEY, ""), MAX_CANDIDATES,
+        within=set(checked_in) if checked_in else None, # nobody checked in: offer everyone
+        exclude=assigned,
+    )
+    return list(team['players']) + candidates
+
+@st.fragment
+@instrumentation.instrumented(root=True)
+def render_team_card(team_id):
+    """
+    One session team. Changing its group or players re-runs and saves only
+    this card; other cards pick up the change on their next run, and a save
+    leaves out players another team took in the meantime.
+    """
+    index = data_manager.load_session_index()
+    team = index.teams_by_id.get(team_id) if index else None
+    if team is None:
+        return
+    _sync_team_widgets(team)
+    player_index = data_manager.load_player_index()
+    
+    with st.container(border=True):
+        left_out = st.session_state.get(TEAM_LEFT_OUT_KEY, {}).pop(team_id, None)
+        if left_out:
+            st.warning("Already in another team: " + ", ".join(left_out))
+        # Header: Name + Group Toggle
+        c_head, c_grp = st.columns([2, 1])
+        with c_head:
+            st.markdown(f"**{team['name']}**")
+        with c_grp:
+             current_grp = team.get('group', 'Group 1')
+             # Simple toggle via radio horizontal
+             st.radio("Grp", ['Group 1', 'Group 2'], 
+                      index=0 if current_grp == 'Group 1' else 1,
+                      key=f"grp_{team['id']}",
+                      label_visibility="collapsed",
+                      horizontal=True,
+                      on_change=_save_team, args=(dict(team),))
+        
+        # Player Multiselect, keyed by id
+        st.multiselect("Players", _team_candidates(team, index),
+                       default=list(team['players']),
+                       format_func=player_index.label,
+                       key=f"team_{team['id']}_sel",
+                       label_visibility="collapsed",
+                       on_change=_save_team, args=(dict(team),))